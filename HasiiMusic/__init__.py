@@ -97,6 +97,10 @@ queue = Queue()
 from HasiiMusic.core.calls import TgCall
 tune = TgCall()
 
+# Initialize the optional metrics endpoint
+from HasiiMusic.core.metrics import MetricsServer
+metrics = MetricsServer()
+
 
 async def stop() -> None:
     logger.info("🛑 Stopping bot...")
@@ -116,5 +120,7 @@ async def stop() -> None:
     await app.exit()
     await userbot.exit()
     await db.close()
+    await yt.close()
+    await metrics.exit()
     
     logger.info("✅ Bot stopped successfully.\n")
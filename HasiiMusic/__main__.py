@@ -23,7 +23,7 @@ if sys.platform != "win32":
         pass
 
 from HasiiMusic import (tune, app, config, db,
-                   logger, stop, userbot, yt)
+                   logger, metrics, stop, userbot, yt)
 from HasiiMusic.plugins import all_modules
 
 
@@ -41,6 +41,9 @@ async def main():
         # Initialize voice call handler
         await tune.boot()
 
+        # Expose download metrics over HTTP (if METRICS_PORT is set)
+        await metrics.boot()
+
         # Load all plugins
         for module in all_modules:
             try:
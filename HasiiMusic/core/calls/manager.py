@@ -45,7 +45,11 @@ class CallsManager:
                         expected_index = self.controller._track_index.get(chat_id, 0)
                         if chat_id not in self.controller._pending_transitions:
                             self.controller._pending_transitions.add(chat_id)
-                            asyncio.create_task(self.controller._queue.play_next(chat_id, expected_index))
+                            # The stream ended on its own: the only case where a
+                            # track that stopped early may be resumed
+                            asyncio.create_task(
+                                self.controller._queue.play_next(chat_id, expected_index, resume=True)
+                            )
                 elif isinstance(update, types.ChatUpdate):
                     if update.status in [
                         types.ChatUpdate.Status.KICKED,
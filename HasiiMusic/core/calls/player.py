@@ -7,6 +7,7 @@
 # - Validates media and fetches thumbnail
 # - Sets up ffmpeg arguments based on media type and seek time
 # - Handles PyTgCalls start with robust retry logic (FloodWaits, ghost streams)
+# - Moves a track playing from a growing download over to the finished file
 # - Sends UI messages with playback status
 # ==============================================================================
 """
@@ -18,12 +19,13 @@ from pyrogram import enums, errors
 from pyrogram.types import Message
 from pytgcalls import exceptions, types
 
-from HasiiMusic import app, config, db, lang, logger, preload
+from HasiiMusic import app, config, db, lang, logger, preload, queue, yt
 from HasiiMusic.helpers import Media, Track, buttons, thumb
 
 class CallPlayer:
     def __init__(self, controller):
         self.controller = controller
+        self._switches: set[asyncio.Task] = set()
 
     async def play_media(
         self,
@@ -37,6 +39,29 @@ class CallPlayer:
                 chat_id, message, media, seek_time
             )
 
+    async def _switch_when_downloaded(self, chat_id: int, media: Media | Track, part: str) -> None:
+        """Restart a progressive track on the finished file once its download is done.
+
+        ffmpeg follows the ".part" file, but it can't tell a finished download from a
+        stalled one, so at the end it would wait out the stall timeout in silence.
+        """
+        final = await yt.settle_progressive(part, wait=True)
+        if not final:
+            return  # failed downloads are handled when the stream stops
+        async with self.controller.get_lock(chat_id):
+            if queue.get_current(chat_id) is not media or media.file_path != part:
+                return  # skipped, stopped or already switched
+            media.file_path = final
+            played = media.time or 0
+            if media.duration_sec and media.duration_sec - played < 3:
+                return  # about to end anyway; not worth a restart
+            logger.info(f"Download of {media.id} finished, switching {chat_id} to the file at {played}s")
+            try:
+                # seek_time > 1 restarts silently, without a new now-playing message
+                await self._play_media_impl(chat_id, None, media, seek_time=max(2, played))
+            except Exception as e:
+                logger.warning(f"Could not switch {chat_id} to the finished download: {e}")
+
     async def _play_media_impl(
         self,
         chat_id: int,
@@ -63,6 +88,15 @@ class CallPlayer:
         else:
             _thumb = config.DEFAULT_THUMB
 
+        # Switch a play-while-downloading track over to the finished file once it's
+        # done. Seeking needs bytes we may not have yet, so wait for them.
+        if yt.is_progressive(media.file_path):
+            media.file_path = await yt.settle_progressive(media.file_path, wait=seek_time > 1)
+        # Direct stream URLs expire; make sure this one outlives the rest of the track
+        elif yt.is_stream_url(media.file_path):
+            remaining = max(0, (media.duration_sec or 0) - int(seek_time))
+            media.file_path = await yt.refresh_stream(media.file_path, min_ttl=remaining)
+
         if not media.file_path:
             if message:
                 return await message.edit_text(_lang["error_no_file"].format(config.SUPPORT_CHAT))
@@ -82,11 +116,24 @@ class CallPlayer:
             raise
 
         # Configure audio stream with optimized buffering for lag-free playback. larger buffers help reduce playback lag
+        if yt.is_canonical(media.file_path):
+            # normalised Ogg/Opus: the format is known, so barely probe it
+            probe = "-probesize 32k -analyzeduration 0"
+        else:
+            probe = "-probesize 10M -analyzeduration 5M"
         if seek_time > 1:
             # seek to the position first and keep the buffers
-            ffmpeg_params = f"-ss {seek_time} -probesize 10M -analyzeduration 5M -rtbufsize 5M -fflags +genpts+igndts"
+            ffmpeg_params = f"-ss {seek_time} {probe} -rtbufsize 5M -fflags +genpts+igndts"
         else:
-            ffmpeg_params = "-probesize 10M -analyzeduration 5M -rtbufsize 5M -fflags +genpts+igndts -sync ext"
+            ffmpeg_params = f"{probe} -rtbufsize 5M -fflags +genpts+igndts -sync ext"
+
+        if media.file_path.endswith(".part"):
+            # still downloading: keep reading at EOF until no new data arrives for a while
+            stall_us = getattr(config, "PROGRESSIVE_STALL_TIMEOUT", 5) * 1_000_000
+            ffmpeg_params = f"-follow 1 -rw_timeout {stall_us} {ffmpeg_params}"
+        elif yt.is_stream_url(media.file_path):
+            # ride out short network hiccups instead of ending the track
+            ffmpeg_params = f"-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 {ffmpeg_params}"
 
         is_video = getattr(media, "video", False)
         video_flags = (
@@ -190,6 +237,11 @@ class CallPlayer:
             else:
                 media.time = 1
 
+            if media.file_path.endswith(".part") and yt.is_progressive(media.file_path):
+                task = asyncio.create_task(self._switch_when_downloaded(chat_id, media, media.file_path))
+                self._switches.add(task)
+                task.add_done_callback(self._switches.discard)
+
             if not seek_time:
                 await db.add_call(chat_id)
                 text = _lang["play_media"].format(
@@ -6,7 +6,8 @@
 # Features:
 # - Plays the next track when current ends
 # - Handles loop mode logic
-# - Lazily auto-fetches large Spotify playlists in the background
+# - Recovers play-while-downloading tracks whose stream stalled
+# - Lazily auto-fetches large Spotify and YouTube playlists in the background
 # ==============================================================================
 """
 
@@ -31,7 +32,9 @@ class CallQueue:
         except Exception as e:
             logger.error(f"Error in replay for {chat_id}: {e}", exc_info=True)
 
-    async def play_next(self, chat_id: int, expected_index: int = None) -> None:
+    async def play_next(self, chat_id: int, expected_index: int = None, resume: bool = False) -> None:
+        """Move on to the next track. resume: the stream ended by itself (not a
+        skip or a playback error), so a track that stopped early is resumed."""
         lock = self.controller.get_lock(chat_id)
         async with lock:
             self.controller._pending_transitions.discard(chat_id)
@@ -40,13 +43,16 @@ class CallQueue:
                 return
             
             self.controller._track_index[chat_id] = self.controller._track_index.get(chat_id, 0) + 1
-            await self._play_next_impl(chat_id)
+            await self._play_next_impl(chat_id, resume=resume)
 
-    async def _play_next_impl(self, chat_id: int) -> None:
+    async def _play_next_impl(self, chat_id: int, resume: bool = False) -> None:
         try:
             if not await db.get_call(chat_id):
                 return
 
+            if resume and await self._resume_stalled(chat_id):
+                return
+
             loop_mode = await db.get_loop(chat_id)
 
             if loop_mode == 1:
@@ -82,10 +88,11 @@ class CallQueue:
                             current_session = self.controller._session_gen.get(chat_id, 0)
                             lock.release()
                             try:
-                                first_track.file_path = await yt.download(
+                                first_track.file_path = await yt.fetch(
                                     first_track.id,
                                     is_live=is_live,
                                     video=getattr(first_track, 'video', False),
+                                    replay=True,
                                 )
                             finally:
                                 await lock.acquire()
@@ -134,7 +141,14 @@ class CallQueue:
             _lang = await lang.get_lang(chat_id)
             msg = None
 
-            if not re.fullmatch(r"[A-Za-z0-9_-]{11}", media.id) or not getattr(media, "thumbnail", None):
+            if re.fullmatch(r"[A-Za-z0-9_-]{11}", media.id):
+                # Usually already hydrated in the background when the playlist was queued
+                if not getattr(media, "thumbnail", None):
+                    try:
+                        await yt.hydrate_track(media)
+                    except Exception:
+                        pass
+            else:
                 try:
                     # use YouTube Music search for spotify tracks, regular YT for everything else
                     is_spotify_track = getattr(media, "playlist_type", None) in ("playlist", "album", "artist")
@@ -155,10 +169,11 @@ class CallQueue:
                 current_session = self.controller._session_gen.get(chat_id, 0)
                 lock.release()
                 try:
-                    media.file_path = await yt.download(
+                    media.file_path = await yt.fetch(
                         media.id,
                         is_live=is_live,
                         video=getattr(media, 'video', False),
+                        replay=loop_mode != 0,
                     )
                 finally:
                     await lock.acquire()
@@ -244,6 +259,57 @@ class CallQueue:
             except Exception:
                 pass
 
+    async def _resume_stalled(self, chat_id: int) -> bool:
+        """Handle a stream that ended before the end of the track.
+
+        ffmpeg gives up on a growing file when no new data arrives in time, and
+        on a direct stream URL when it expires or starts answering 403. If that
+        happened before the end of the track, wait for the full download (or
+        re-resolve the URL) and pick up where playback stopped. Returns True if
+        playback resumed. Only called when the stream ended by itself.
+        """
+        media = queue.get_current(chat_id)
+        if not media:
+            return False
+        progressive = yt.is_progressive(media.file_path)
+        if not progressive and not yt.is_stream_url(media.file_path):
+            return False
+        played = media.time or 0
+        early = bool(media.duration_sec) and played < media.duration_sec - 10
+        if not progressive and not early:
+            return False
+
+        lock = self.controller.get_lock(chat_id)
+        current_session = self.controller._session_gen.get(chat_id, 0)
+        lock.release()
+        try:
+            if progressive:
+                final = await yt.settle_progressive(media.file_path, wait=True)
+            elif await yt.stream_dead(media.file_path):
+                final = await yt.refresh_stream(
+                    media.file_path, min_ttl=media.duration_sec - played, force=True
+                )
+            else:
+                # Stopped early with a URL that still works (the track's
+                # duration was off, or the stream was cut): not an expiry
+                return False
+        finally:
+            await lock.acquire()
+
+        if self.controller._session_gen.get(chat_id, 0) != current_session:
+            return True
+        if queue.get_current(chat_id) is not media:
+            return False
+        media.file_path = final
+        if not final or not early:
+            # finished normally (or unrecoverable): move on to the next track
+            return False
+
+        kind = "Progressive" if progressive else "Direct"
+        logger.info(f"{kind} stream ended early in {chat_id} at {played}s, resuming")
+        await self.controller._player._play_media_impl(chat_id, None, media, seek_time=played)
+        return True
+
     async def _fetch_next_playlist_batch(
         self, chat_id: int, playlist_url: str, user: str, offset: int, limit: int = 30
     ) -> None:
@@ -257,5 +323,17 @@ class CallQueue:
                     logger.info(
                         f"📋 Autoloaded next {len(next_tracks)} playlist tracks (offset {offset}) for chat {chat_id}"
                     )
+            elif yt.valid(playlist_url):
+                # Usually sliced from the page listed ahead while the last batch played
+                next_tracks = await yt.playlist(limit, user, playlist_url, offset=offset)
+                # Leave out videos already known to be private, removed or blocked
+                next_tracks = [t for t in next_tracks if not yt.unplayable(t.id)]
+                if next_tracks:
+                    for track in next_tracks:
+                        queue.add(chat_id, track)
+                    yt.hydrate(next_tracks)
+                    logger.info(
+                        f"📋 Autoloaded next {len(next_tracks)} YouTube playlist tracks (offset {offset}) for chat {chat_id}"
+                    )
         except Exception as e:
             logger.debug(f"Could not autoload next playlist batch for {chat_id}: {e}")
@@ -0,0 +1,50 @@
+# ==============================================================================
+# metrics.py - Metrics Endpoint
+# ==============================================================================
+# Serves the download pipeline stats as JSON over HTTP for dashboards and
+# scrapers. Disabled unless METRICS_PORT is set.
+# Features:
+# - GET /metrics returns yt.stats() as JSON
+# - Binds to localhost by default
+# ==============================================================================
+
+import json
+from functools import partial
+from typing import Optional
+
+from aiohttp import web
+
+from HasiiMusic import config, logger
+
+
+class MetricsServer:
+    def __init__(self):
+        self.host = getattr(config, "METRICS_HOST", "127.0.0.1")
+        self.port = getattr(config, "METRICS_PORT", 0)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _metrics(self, _request: web.Request) -> web.Response:
+        from HasiiMusic import yt
+
+        return web.json_response(yt.stats(), dumps=partial(json.dumps, default=str))
+
+    async def boot(self) -> None:
+        if not self.port:
+            return
+        webapp = web.Application()
+        webapp.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(webapp, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error(f"❌ Could not start metrics endpoint on {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logger.info(f"📊 Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    async def exit(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -8,6 +8,8 @@
 # - blacklist: Blacklisted users/chats
 # - calls: Active voice call sessions
 # - cache: Admin list cache
+# - search_cache: YouTube search results (expired by a TTL index)
+# - tracks: YouTube track metadata by video ID (expired by a TTL index)
 #
 # Features:
 # - Async MongoDB operations for better performance
@@ -86,6 +88,9 @@ class MongoDB:
         self.users = []
         self.usersdb = self.db.users
 
+        self.searchdb = self.db.search_cache
+        self.trackdb = self.db.tracks
+
     async def connect(self) -> None:
         # connect to the database and retry if it fails.
         max_retries = 3
@@ -102,6 +107,8 @@ class MongoDB:
                 await self.authdb.create_index("_id")
                 await self.langdb.create_index("_id")
                 await self.cache.create_index("_id")
+                await self.searchdb.create_index("expires", expireAfterSeconds=0)
+                await self.trackdb.create_index("expires", expireAfterSeconds=0)
 
                 await self.load_cache()
                 return # connected successfully
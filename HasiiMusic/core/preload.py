@@ -6,7 +6,7 @@
 #
 # Features:
 # - Downloads next 2-3 tracks in background while current track plays
-# - Respects existing download semaphore limits (max 5 concurrent)
+# - Downloads at background priority so on-demand /play is never starved
 # - Automatically cancels preload tasks when queue changes
 # - Prevents duplicate downloads
 # - Smart prioritization (next track = highest priority)
@@ -17,6 +17,7 @@ from pathlib import Path
 from typing import Dict, Set
 
 from HasiiMusic import logger
+from HasiiMusic.core.youtube import Priority
 
 
 class PreloadManager:
@@ -53,7 +54,7 @@ class PreloadManager:
             self._preloading[chat_id] = set()
         
         # start a preload task for each track that needs downloading
-        for track in upcoming_tracks:
+        for position, track in enumerate(upcoming_tracks):
             # skip tracks that are already downloaded or being preloaded
             if queue.is_downloaded(track):
                 continue
@@ -61,13 +62,18 @@ class PreloadManager:
             track_id = getattr(track, 'id', None)
             if not track_id or track_id in self._preloading[chat_id]:
                 continue
+            # known to be private/removed/blocked: it will be skipped when its turn comes
+            if yt.unplayable(track_id):
+                continue
             
             # mark the track as being preloaded
             self._preloading[chat_id].add(track_id)
             
             # Create background task for this track
+            # the track right after the current one is next up, the rest are preloads
+            priority = Priority.NEXT_UP if position == 0 else Priority.PRELOAD
             task = asyncio.create_task(
-                self._preload_track(chat_id, track)
+                self._preload_track(chat_id, track, priority)
             )
             self._preload_tasks[chat_id].add(task)
             
@@ -76,25 +82,30 @@ class PreloadManager:
                 lambda t, cid=chat_id: self._cleanup_task(cid, t)
             )
     
-    async def _preload_track(self, chat_id: int, track) -> None:
+    async def _preload_track(self, chat_id: int, track, priority: Priority = Priority.PRELOAD) -> None:
         """
         Preload a single track in the background.
         
         Args:
             chat_id: The chat ID this track belongs to
             track: Track object to preload
+            priority: Download scheduler class for this track
         """
         from HasiiMusic import yt
         
         try:
             track_id = track.id
+            # Whether it is live (and its thumbnail for the now-playing card)
+            # may already be known from an earlier search or download
+            await yt.fill(track)
             is_live = getattr(track, 'is_live', False)
             
-            # download the track using the existing download limit
-            file_path = await yt.download(
+            # download the track through the priority scheduler
+            file_path = await yt.fetch(
                 track_id,
                 is_live=is_live,
                 video=getattr(track, "video", False),
+                priority=priority,
             )
             
             if file_path:
@@ -148,6 +159,12 @@ class PreloadManager:
         if chat_id in self._preloading:
             self._preloading[chat_id].clear()
     
+    def active_ids(self) -> Set[str]:
+        """
+        Return the track IDs currently being preloaded across all chats.
+        """
+        return {track_id for ids in self._preloading.values() for track_id in ids}
+
     def _cleanup_task(self, chat_id: int, task: asyncio.Task) -> None:
         """
         Clean up completed task from tracking.
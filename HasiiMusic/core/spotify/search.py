@@ -6,29 +6,49 @@
 # - Uses Spotipy client or fallback embed scraper dynamically
 # - Formats raw data into uniform Track objects
 # - Lazily queries YouTube to find playable audio links
+# - Coalesces concurrent resolutions of the same Spotify track
+# - Caches resolved tracks in the shared search cache under the link's
+#   canonical key, so repeat links skip both Spotify and YouTube
 # ==============================================================================
 
 
 import asyncio
+from dataclasses import replace
 from typing import List, Optional, Tuple
 from HasiiMusic import logger
-from HasiiMusic.helpers import Track
+from HasiiMusic.helpers import SingleFlight, Track, normalize_query
 
 class SpotifySearcher:
     def __init__(self, auth_manager, embed_scraper, utils):
         self._auth = auth_manager
         self._embeds = embed_scraper
         self._utils = utils
+        self._flights = SingleFlight()
 
     async def search(self, url: str, m_id: int) -> Optional[Track]:
         """Fetch a single track from Spotify and resolve to a YouTube Track."""
-        # Lazy import to avoid circular dependencies (HasiiMusic.yt imports Spotify)
-        from HasiiMusic import yt
-
         item_type, item_id = self._utils._parse(url)
         if not item_id:
             return None
 
+        key = normalize_query(f"spotify:{item_type}:{item_id}")
+        track = await self._flights.do(
+            key, lambda: self._resolve(item_type, item_id, url, key)
+        )
+        if not track:
+            return None
+        fresh = replace(track)
+        fresh.message_id = m_id
+        return fresh
+
+    async def _resolve(self, item_type: str, item_id: str, url: str, key: str) -> Optional[Track]:
+        # Lazy import to avoid circular dependencies (HasiiMusic.yt imports Spotify)
+        from HasiiMusic import yt
+
+        cached = await yt.cached_search(key)
+        if cached:
+            return cached
+
         def _fetch():
             # Try official Spotipy API first if client exists
             if self._auth.client:
@@ -56,7 +76,10 @@ class SpotifySearcher:
             if not query:
                 logger.warning(f"⚠️ Could not extract track details for {url}")
                 return None
-            return await yt.search(query, m_id, music=True)
+            track = await yt.search(query, 0, music=True)
+            if track:
+                yt.remember_search(key, track)
+            return track
         except Exception as e:
             logger.error(f"❌ Spotify single track error: {e}")
             return None
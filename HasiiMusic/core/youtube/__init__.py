@@ -10,21 +10,53 @@
 
 from typing import Optional, Union
 from pyrogram import types
+from HasiiMusic import config
 from HasiiMusic.helpers import Track
 
 from .utils import YouTubeUtils
 from .cookies import CookieManager
 from .storage import StorageManager
 from .search import Searcher
+from .inline import InlineSearcher
+from .metadata import TrackStore
+from .hydrate import PlaylistHydrator
+from .unplayable import UnplayableCache
+from .playlist import PlaylistPager
 from .download import Downloader
+from .pool import ExtractorPool
+from .streams import StreamResolver
+from .transcode import Transcoder
+from .scheduler import Priority
 
 class YouTube:
-    def __init__(self):
+    def __init__(self, backend=None):
+        """backend: an object with ExtractorPool's extract/stats/close API (for
+        example core.youtube.fake.FakeExtractor) to use instead of yt-dlp workers."""
         self._utils = YouTubeUtils()
         self._cookies = CookieManager()
         self._storage = StorageManager()
-        self._searcher = Searcher(self._cookies)
-        self._downloader = Downloader(self._cookies, self._storage, self._searcher)
+        if backend is not None:
+            backend.on_result = self._cookies.report
+            self._pool = backend
+        else:
+            self._pool = ExtractorPool(
+                size=getattr(config, "YTDLP_WORKERS", 0),
+                max_jobs=getattr(config, "YTDLP_WORKER_MAX_JOBS", 200),
+                timeout=getattr(config, "YTDLP_WORKER_TIMEOUT", 300),
+                on_result=self._cookies.report,
+            )
+        self._tracks = TrackStore()
+        self._unplayable = UnplayableCache()
+        self._searcher = Searcher(self._cookies, self._pool, self._tracks, self._unplayable)
+        self._inline = InlineSearcher(self._cookies, self._pool, self._tracks)
+        self._hydrator = PlaylistHydrator(self._searcher, self._tracks)
+        self._playlists = PlaylistPager(self._cookies, self._pool)
+        self._streams = StreamResolver(self._cookies, self._pool)
+        self._transcoder = Transcoder(self._storage)
+        self._downloader = Downloader(
+            self._cookies, self._storage, self._searcher, self._pool,
+            self._streams, self._transcoder, self._unplayable, self._tracks,
+        )
 
         # Expose legacy attributes for backwards compatibility
         self.base = self._utils.base
@@ -43,13 +75,118 @@ class YouTube:
     async def save_cookies(self, urls: list[str]) -> None:
         await self._cookies.save_cookies(urls)
 
+    # --- Extraction ---
+    async def extract_info(self, url: str, opts: dict) -> Optional[dict]:
+        return await self._pool.extract(url, opts)
+
+    def pool_stats(self) -> dict:
+        return self._pool.stats()
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    def stats(self) -> dict:
+        """Everything the download pipeline knows about itself, for /dlstats and /metrics."""
+        return {
+            **self._downloader.stats(),
+            "cache": self._storage.stats(),
+            "cookies": self._cookies.stats(),
+            "search": self._searcher.search_cache.stats(),
+            "search_hedge": self._searcher.hedger.stats(),
+            "inline": self._inline.stats(),
+            "tracks": self._tracks.stats(),
+            "hydration": self._hydrator.stats(),
+            "playlists": self._playlists.stats(),
+            "unplayable": self._unplayable.stats(),
+            "pool": self._pool.stats(),
+            "streams": self._streams.stats(),
+            "transcode": self._transcoder.stats(),
+        }
+
     # --- Search & Playlist ---
     async def search(self, query: str, m_id: int, music: bool = False) -> Track | None:
         return await self._searcher.search(query, m_id, music)
 
-    async def playlist(self, limit: int, user: str, url: str) -> list[Track]:
-        return await self._searcher.playlist(limit, user, url)
+    async def playlist(self, limit: int, user: str, url: str, offset: int = 0) -> list[Track]:
+        return await self._playlists.page(url, user, offset, limit)
+
+    async def inline_search(self, user_id: int, text: str) -> Optional[list[dict]]:
+        return await self._inline.search(user_id, text)
+
+    def hydrate(self, tracks: list[Track]) -> None:
+        self._hydrator.hydrate(tracks)
+
+    async def hydrate_track(self, track: Track) -> bool:
+        return await self._hydrator.hydrate_track(track)
+
+    def known(self, video_id: str) -> Optional[Track]:
+        """What the track metadata store knows about video_id (memory only)."""
+        return self._tracks.get(video_id)
+
+    async def fill(self, track: Track) -> bool:
+        """Fill a track's missing metadata from the track store, without extracting."""
+        return await self._tracks.fill(track)
+
+    def unplayable(self, video_id: str) -> Optional[str]:
+        """Why YouTube recently refused to serve video_id, or None."""
+        return self._unplayable.get(video_id)
+
+    async def cached_search(self, key: str) -> Optional[Track]:
+        return await self._searcher.cached(key)
+
+    def remember_search(self, key: str, track: Track) -> None:
+        self._searcher.remember(key, track)
+
+    # --- Storage ---
+    def cache_stats(self) -> dict:
+        return self._storage.stats()
+
+    def is_canonical(self, path: Optional[str]) -> bool:
+        return self._storage.is_canonical(path)
+
+    def transcode_stats(self) -> dict:
+        return self._transcoder.stats()
 
     # --- Download ---
-    async def download(self, video_id: str, is_live: bool = False, video: bool = False) -> Optional[str]:
-        return await self._downloader.download(video_id, is_live, video)
+    async def fetch(
+        self,
+        video_id: str,
+        is_live: bool = False,
+        video: bool = False,
+        priority: Priority = Priority.NOW_PLAYING,
+        replay: bool = False,
+    ) -> Optional[str]:
+        return await self._downloader.fetch(video_id, is_live, video, priority, replay)
+
+    async def download(
+        self,
+        video_id: str,
+        is_live: bool = False,
+        video: bool = False,
+        priority: Priority = Priority.NOW_PLAYING,
+    ) -> Optional[str]:
+        return await self._downloader.download(video_id, is_live, video, priority)
+
+    async def download_progressive(
+        self, video_id: str, priority: Priority = Priority.NOW_PLAYING
+    ) -> Optional[str]:
+        return await self._downloader.download_progressive(video_id, priority)
+
+    def warm(self, video_id: str) -> None:
+        self._downloader.warm(video_id)
+
+    def is_progressive(self, path: Optional[str]) -> bool:
+        return self._downloader.is_progressive(path)
+
+    async def settle_progressive(self, path: Optional[str], wait: bool = False) -> Optional[str]:
+        return await self._downloader.settle_progressive(path, wait)
+
+    # --- Direct streams ---
+    def is_stream_url(self, path: Optional[str]) -> bool:
+        return self._streams.is_stream(path)
+
+    async def refresh_stream(self, url: str, min_ttl: int = 0, force: bool = False) -> Optional[str]:
+        return await self._streams.refresh(url, min_ttl, force)
+
+    async def stream_dead(self, url: str) -> bool:
+        return await self._streams.is_dead(url)
@@ -3,26 +3,86 @@
 # ==============================================================================
 # This file manages the downloading and loading of YouTube cookies.
 # Features:
-# - Downloads cookies from an external raw URL
-# - Caches and randomizes cookies for requests
+# - Downloads cookies from external raw URLs concurrently
+# - Scores every cookie file from its recent successes and failures
+# - Quarantines failing cookies with exponential backoff
+# - Weights traffic toward healthy cookies, within a per-cookie rate limit
 # ==============================================================================
 
+import asyncio
 import os
 import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
 import aiohttp
-from HasiiMusic import logger
+from HasiiMusic import config, logger
+
+# Errors that mean YouTube rejected the cookie rather than the video
+COOKIE_FAULTS = (
+    "confirm you're not a bot",
+    "confirm you’re not a bot",  # YouTube uses a typographic apostrophe
+    "not a bot",
+    "login required",
+    "cookies are no longer valid",
+    "rate-limited",
+    "http error 429",
+)
+# A 403 only counts against the cookie when YouTube's pages refused the
+# extraction. A 403 on googlevideo media ("unable to download video data")
+# means an expired signed URL or IP throttling, whatever cookie was used.
+EXTRACTION_403 = (
+    "unable to download webpage: http error 403",
+    "unable to download api page: http error 403",
+)
+# Failures of the video itself that share wording with cookie faults
+# ("Sign in to confirm your age"); they never count against a cookie
+VIDEO_FAULTS = (
+    "confirm your age",
+    "age-restricted",
+    "inappropriate for some users",
+)
+
+
+class _CookieHealth:
+    def __init__(self):
+        self.score = 1.0  # moving average of success (1.0 = always works)
+        self.successes = 0
+        self.failures = 0
+        self.streak = 0  # consecutive cookie faults
+        self.quarantined_until = 0.0
+        self.recent: Deque[float] = deque()  # request times within the last minute
+
+    def used_last_minute(self, now: float) -> int:
+        while self.recent and now - self.recent[0] > 60:
+            self.recent.popleft()
+        return len(self.recent)
+
 
 class CookieManager:
     def __init__(self):
         self.cookies = []  # List of available cookie files
         self.checked = False  # Whether cookies directory has been checked
         self.warned = False  # Whether missing cookies warning has been shown
+        self._health: Dict[str, _CookieHealth] = {}
+        self.rate_per_min = getattr(config, "COOKIE_RATE_PER_MIN", 30)
+        self.quarantine_base = getattr(config, "COOKIE_QUARANTINE_BASE", 60)
+        self.quarantine_max = getattr(config, "COOKIE_QUARANTINE_MAX", 3600)
+
+    def _health_of(self, name: str) -> _CookieHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = _CookieHealth()
+        return health
 
-    def get_cookies(self):
+    def get_cookies(self, exclude: Optional[str] = None):
+        """Path of the cookie file to use next. exclude: a cookie path to avoid
+        if any other is available (e.g. for a hedged retry)."""
         if not self.checked:
             if os.path.exists("HasiiMusic/cookies"):
                 for file in os.listdir("HasiiMusic/cookies"):
-                    if file.endswith(".txt"):
+                    if file.endswith(".txt") and file not in self.cookies:
                         self.cookies.append(file)
             self.checked = True
         if not self.cookies:
@@ -30,40 +90,105 @@ class CookieManager:
                 self.warned = True
                 logger.warning("Cookies are missing; downloads might fail.")
             return None
-        return f"HasiiMusic/cookies/{random.choice(self.cookies)}"
+        name = self._pick(os.path.basename(exclude) if exclude else None)
+        self._health_of(name).recent.append(time.monotonic())
+        return f"HasiiMusic/cookies/{name}"
+
+    def _pick(self, exclude: Optional[str] = None) -> str:
+        """Weighted pick among healthy cookies that still have rate budget.
+
+        Falls back to cookies over their rate limit, and then to the cookie
+        whose quarantine ends first, so a request always gets some cookie.
+        """
+        now = time.monotonic()
+        candidates = [c for c in self.cookies if c != exclude] or self.cookies
+        healthy = [c for c in candidates if self._health_of(c).quarantined_until <= now]
+        if not healthy:
+            return min(candidates, key=lambda c: self._health_of(c).quarantined_until)
+        available = [
+            c for c in healthy
+            if not self.rate_per_min or self._health_of(c).used_last_minute(now) < self.rate_per_min
+        ]
+        if not available:
+            return min(healthy, key=lambda c: self._health_of(c).used_last_minute(now))
+        weights = [max(0.05, self._health_of(c).score) for c in available]
+        return random.choices(available, weights=weights)[0]
+
+    def report(self, cookie_path: Optional[str], ok: bool, error: str = "") -> None:
+        """Record the outcome of a yt-dlp request made with cookie_path."""
+        if not cookie_path:
+            return
+        name = os.path.basename(cookie_path)
+        if name not in self.cookies:
+            return
+        health = self._health_of(name)
+        if ok:
+            health.successes += 1
+            health.streak = 0
+            health.score = 0.8 * health.score + 0.2
+            return
+
+        error = error.lower()
+        if any(fault in error for fault in VIDEO_FAULTS) or not any(
+            fault in error for fault in COOKIE_FAULTS + EXTRACTION_403
+        ):
+            return  # the video failed, not the cookie
+        health.failures += 1
+        health.streak += 1
+        health.score *= 0.5
+        backoff = min(self.quarantine_max, self.quarantine_base * 2 ** (health.streak - 1))
+        health.quarantined_until = time.monotonic() + backoff
+        logger.warning(f"🍪 Quarantined {name} for {backoff}s after {health.streak} failure(s)")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            name: {
+                "score": round(h.score, 3),
+                "successes": h.successes,
+                "failures": h.failures,
+                "quarantined_for": max(0, round(h.quarantined_until - now)),
+                "requests_last_minute": h.used_last_minute(now),
+            }
+            for name, h in ((c, self._health_of(c)) for c in self.cookies)
+        }
+
+    async def _save_one(self, session: aiohttp.ClientSession, url: str) -> bool:
+        try:
+            path = f"HasiiMusic/cookies/cookie{random.randint(10000, 99999)}.txt"
+            link = url.replace("me/", "me/raw/")
+            async with session.get(link) as resp:
+                if resp.status != 200:
+                    logger.error(f"❌ Cookie download failed: HTTP {resp.status} from {url}")
+                    return False
+                content = await resp.read()
+            if not content or len(content) < 50:
+                logger.error(f"❌ Cookie file empty or invalid from {url}")
+                return False
+            with open(path, "wb") as fw:
+                fw.write(content)
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                # Update cookie list
+                cookie_filename = os.path.basename(path)
+                if cookie_filename not in self.cookies:
+                    self.cookies.append(cookie_filename)
+                logger.info(f"✅ Saved: {cookie_filename} ({len(content)} bytes)")
+                return True
+        except Exception as e:
+            logger.error(f"❌ Cookie download error from {url}: {e}")
+        return False
 
     async def save_cookies(self, urls: list[str]) -> None:
         logger.info("🍪 Saving cookies from urls...")
-        saved_count = 0
         os.makedirs("HasiiMusic/cookies", exist_ok=True)
-        for url in urls:
-            try:
-                path = f"HasiiMusic/cookies/cookie{random.randint(10000, 99999)}.txt"
-                link = url.replace("me/", "me/raw/")
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(link) as resp:
-                        if resp.status != 200:
-                            logger.error(f"❌ Cookie download failed: HTTP {resp.status} from {url}")
-                            continue
-                        content = await resp.read()
-                        if not content or len(content) < 50:
-                            logger.error(f"❌ Cookie file empty or invalid from {url}")
-                            continue
-                        with open(path, "wb") as fw:
-                            fw.write(content)
-                        if os.path.exists(path) and os.path.getsize(path) > 0:
-                            saved_count += 1
-                            # Update cookie list
-                            cookie_filename = os.path.basename(path)
-                            if cookie_filename not in self.cookies:
-                                self.cookies.append(cookie_filename)
-                            logger.info(f"✅ Saved: {cookie_filename} ({len(content)} bytes)")
-            except Exception as e:
-                logger.error(f"❌ Cookie download error from {url}: {e}")
-        
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(*(self._save_one(session, url) for url in urls))
+        saved_count = sum(results)
+
         # Refresh cookie list
         self.checked = True
-        
+
         if saved_count > 0:
             logger.info(f"✅ Cookies saved. ({saved_count} file(s))")
         else:
@@ -3,36 +3,160 @@
 # ==============================================================================
 # This file orchestrates the downloading of audio and video from YouTube.
 # Features:
-# - Limits concurrency using semaphores
-# - Prevents duplicate concurrent downloads using locks
-# - Executes yt-dlp to download streams and files
+# - Schedules downloads by priority (now playing before background preloads)
+# - Coalesces duplicate concurrent downloads into a single in-flight job
+# - Executes yt-dlp through the extractor pool to download streams and files
 # - Resolves Spotify fallbacks lazily
+# - Hands out partially downloaded files for play-while-downloading
+# - Streams directly from resolved URLs for tracks that won't be replayed
+# - Reuses a cached video for audio requests instead of downloading again
+# - Normalises background audio downloads to the canonical playback format
+# - Fetches large video formats over several ranged connections
+# - Records a telemetry event for every download request
+# - Checks disk headroom before starting, deferring preloads when low
+# - Resumes skipped or interrupted downloads from their partial files
+# - Warms the cache speculatively for tracks that are likely to be played
+# - Fails at once for videos YouTube recently refused to serve
+# - Records what each download learns about a video (metadata, formats) in
+#   the track metadata store, and sizes downloads from it
 # ==============================================================================
 
+import os
 import re
-import glob
-import time
 import asyncio
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 import yt_dlp
 from HasiiMusic import config, logger
+from HasiiMusic.helpers import SingleFlight
+
+from .index import AUDIO_EXTS, media_kind
+from .ranged import PART_EXT, RangedFetcher
+from .scheduler import DownloadScheduler, Priority
+from .telemetry import DownloadEvent, DownloadTelemetry
+from .worker import TIMING_KEY
+
+# Assumed sizes before the real one is known; only used to decide whether
+# disk space is tight enough to look the real size up
+AUDIO_SIZE_ESTIMATE = 10 * 1024 * 1024
+VIDEO_SIZE_ESTIMATE = 250 * 1024 * 1024
+
 
 class Downloader:
-    def __init__(self, cookies_manager, storage_manager, searcher):
+    def __init__(
+        self, cookies_manager, storage_manager, searcher, pool, streams, transcoder, unplayable, tracks,
+    ):
         self._cookies = cookies_manager
         self._storage = storage_manager
         self._searcher = searcher
-        self._download_locks: dict = {}
-        self._download_semaphore = asyncio.Semaphore(5)
+        self._pool = pool
+        self._streams = streams
+        self._transcoder = transcoder
+        self._unplayable = unplayable
+        self._tracks = tracks
+        self._derive_audio = getattr(config, "DOWNLOAD_DERIVE_AUDIO", True)
+        self._normalize = getattr(config, "AUDIO_NORMALIZE", False)
+        self.telemetry = DownloadTelemetry()
+        connections = getattr(config, "VIDEO_DOWNLOAD_CONNECTIONS", 0)
+        self._ranged = RangedFetcher(
+            connections=connections,
+            chunk_size=getattr(config, "VIDEO_DOWNLOAD_CHUNK_MB", 4) * 1024 * 1024,
+            rate_limit=getattr(config, "VIDEO_DOWNLOAD_RATE_KB", 0) * 1024,
+        ) if connections > 1 else None
+        self._flights = SingleFlight()
+        # {flight key: most urgent priority among its callers}; joiners raise it
+        self._flight_priority: dict[str, Priority] = {}
+        self._scheduler = DownloadScheduler(
+            slots=getattr(config, "DOWNLOAD_CONCURRENCY", 5),
+            background_slots=getattr(config, "DOWNLOAD_BACKGROUND_SLOTS", 0),
+        )
         self._max_video_height = getattr(config, "VIDEO_MAX_HEIGHT", 1080)
-        
-    def _get_download_lock(self, video_id: str) -> asyncio.Lock:
-        if video_id not in self._download_locks:
-            self._download_locks[video_id] = asyncio.Lock()
-        return self._download_locks[video_id]
+        # {".part path": download task} for tracks playing while they download
+        self._progressive: OrderedDict[str, asyncio.Task] = OrderedDict()
+        self._buffer_bytes = getattr(config, "PROGRESSIVE_BUFFER_KB", 1024) * 1024
+        # {video_id: task} for speculative warm-up fetches
+        self._warming: dict[str, asyncio.Task] = {}
+
+    def _cached(self, video_id: str, video: bool = False, count: bool = True) -> Optional[str]:
+        """Cache lookup. An audio request served from a cached video plays the video
+        file with video ignored, and schedules a remux so the next hit is audio-only."""
+        cached = self._storage.find_cached(video_id, video, count)
+        if cached and not video and self._derive_audio and media_kind(cached) == "video":
+            self._transcoder.derive_audio(video_id, cached)
+        return cached
+
+    async def fetch(
+        self,
+        video_id: str,
+        is_live: bool = False,
+        video: bool = False,
+        priority: Priority = Priority.NOW_PLAYING,
+        replay: bool = False,
+    ) -> Optional[str]:
+        """Return something playable for a track: a cached file, a direct stream URL,
+        a growing progressive file, or a finished download, depending on config.
+
+        replay: the track will likely be played again (loop mode), so it's worth
+        writing to disk even in direct-stream mode.
+        """
+        if (
+            is_live or video or not re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id)
+            or self._unplayable.get(video_id, count=False)
+        ):
+            return await self.download(video_id, is_live=is_live, video=video, priority=priority)
 
-    async def download(self, video_id: str, is_live: bool = False, video: bool = False) -> Optional[str]:
+        if getattr(config, "DIRECT_STREAM", False) and not replay:
+            cached = self._cached(video_id)
+            if cached:
+                return cached
+            url = await self._streams.resolve(video_id)
+            if url:
+                return url
+            # Resolution failed, fall through to a regular download
+
+        if getattr(config, "PROGRESSIVE_PLAYBACK", False) and priority == Priority.NOW_PLAYING:
+            return await self.download_progressive(video_id, priority)
+        return await self.download(video_id, priority=priority)
+
+    async def download(
+        self,
+        video_id: str,
+        is_live: bool = False,
+        video: bool = False,
+        priority: Priority = Priority.NOW_PLAYING,
+    ) -> Optional[str]:
+        event = DownloadEvent(
+            video_id,
+            kind="live" if is_live else "video" if video else "audio",
+            priority=Priority(priority).name.lower(),
+        )
+        path = None
+        try:
+            path = await self._download(video_id, is_live, video, priority, event)
+            return path
+        except asyncio.CancelledError:
+            event.fail("cancelled")
+            if not is_live and re.fullmatch(r"[A-Za-z0-9_-]{11}", event.video_id):
+                # Remember what was fetched so the next request resumes from it
+                self._storage.register(event.video_id)
+            raise
+        except Exception:
+            event.fail("exception")
+            raise
+        finally:
+            if not path:
+                event.fail("failed")
+            self.telemetry.record(event)
+
+    async def _download(
+        self,
+        video_id: str,
+        is_live: bool,
+        video: bool,
+        priority: Priority,
+        event: DownloadEvent,
+    ) -> Optional[str]:
         # Lazily resolve query or Spotify link to a YouTube video ID if needed
         if not re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id):
             try:
@@ -42,20 +166,30 @@ class Downloader:
                 else:
                     resolved = await self._searcher.search(video_id, 0)
                 if resolved and resolved.id:
-                    video_id = resolved.id
+                    video_id = event.video_id = resolved.id
                     is_live = getattr(resolved, "is_live", is_live)
                 else:
                     logger.warning(f"Could not resolve '{video_id}' for download")
+                    event.fail("unresolved")
                     return None
             except Exception as e:
                 logger.warning(f"Failed to lazily resolve '{video_id}': {e}")
+                event.fail("unresolved")
                 return None
 
         url = "https://www.youtube.com/watch?v=" + video_id
 
+        reason = self._unplayable.get(video_id)
+        if reason:
+            event.cache = "negative"
+            event.fail(reason)
+            return None
+
         # Extract live stream URL
         if is_live:
             cookie = self._cookies.get_cookies()
+            event.kind = "live"
+            event.cookie = cookie
             ydl_opts = {
                 "quiet": True,
                 "no_warnings": True,
@@ -67,86 +201,53 @@ class Downloader:
                 "sleep_interval_requests": 1,
             }
 
-            def _extract_url():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    try:
-                        info = ydl.extract_info(url, download=False)
-                        if not info:
-                            return None
-
-                        direct = info.get("url")
-                        if direct:
-                            return direct
-
-                        # Find URL in formats
-                        for fmt in info.get("formats", []):
-                            if fmt.get("acodec") != "none" and fmt.get("url"):
-                                return fmt["url"]
-
-                        return info.get("manifest_url")
-                    except yt_dlp.utils.ExtractorError as ex:
-                        error_msg = str(ex)
-                        if "not available" in error_msg.lower():
-                            logger.error(
-                                "Video format not available or region-blocked.")
-                        else:
-                            logger.error(
-                                "Live stream URL extraction failed: %s", ex)
-                        return None
-                    except Exception as ex:
-                        logger.error(
-                            "Unexpected error during live stream extraction: %s", ex)
+            async def _resolve_live() -> Optional[str]:
+                try:
+                    info = await asyncio.wait_for(self._pool.extract(url, ydl_opts), timeout=35)
+                    if not info:
                         return None
 
-            try:
-                stream_url = await asyncio.wait_for(asyncio.to_thread(_extract_url), timeout=35)
-            except asyncio.TimeoutError:
-                logger.error("Live stream URL extraction timed out for %s", video_id)
-                return None
+                    direct = info.get("url")
+                    if direct:
+                        return direct
 
-            return stream_url
+                    # Find URL in formats
+                    for fmt in info.get("formats", []):
+                        if fmt.get("acodec") != "none" and fmt.get("url"):
+                            return fmt["url"]
 
-        # Let yt-dlp choose the best format
-        filename_pattern = f"downloads/{video_id}"
+                    return info.get("manifest_url")
+                except asyncio.TimeoutError:
+                    logger.error("Live stream URL extraction timed out for %s", video_id)
+                    event.fail("timeout")
+                    return None
+                except yt_dlp.utils.ExtractorError as ex:
+                    error_msg = str(ex)
+                    self._unplayable.mark(video_id, ex)
+                    if "not available" in error_msg.lower():
+                        logger.error(
+                            "Video format not available or region-blocked.")
+                        event.fail("unavailable")
+                    else:
+                        logger.error(
+                            "Live stream URL extraction failed: %s", ex)
+                        event.fail("extractor")
+                    return None
+                except Exception as ex:
+                    logger.error(
+                        "Unexpected error during live stream extraction: %s", ex)
+                    event.fail("unexpected")
+                    return None
 
-        def _check_cache() -> Optional[str]:
-            """Check downloads/ for a valid existing file. Deletes invalid stubs on the way."""
-            existing_files = [
-                f for f in glob.glob(f"{filename_pattern}.*")
-                if not f.endswith((".part", ".ytdl", ".temp"))
-            ]
-            if video:
-                video_candidates = [
-                    f for f in existing_files
-                    if Path(f).suffix.lower() in {".mp4", ".mkv", ".mov"}
-                ]
-                for f in video_candidates:
-                    if self._storage.is_valid_file(f):
-                        return f
-                    self._storage.delete_stub(f)
-            else:
-                audio_candidates = [
-                    f for f in existing_files
-                    if Path(f).suffix.lower() in {".m4a", ".webm", ".opus", ".mp3", ".ogg", ".wav", ".flac"}
-                ]
-                for f in audio_candidates:
-                    if self._storage.is_valid_file(f):
-                        return f
-                    self._storage.delete_stub(f)
-                # Fallback to mp4 for audio
-                container_fallbacks = [
-                    f for f in existing_files
-                    if Path(f).suffix.lower() in {".mp4", ".mkv", ".mov"}
-                ]
-                for f in container_fallbacks:
-                    if self._storage.is_valid_file(f):
-                        return f
-                    self._storage.delete_stub(f)
-            return None
+            live_key = f"{video_id}:live"
+            if self._flights.in_flight(live_key):
+                event.cache = "coalesced"
+            return await self._flights.do(live_key, _resolve_live)
 
         # Fast path: check cache without acquiring any lock
-        cached = _check_cache()
+        cached = self._cached(video_id, video)
         if cached:
+            event.cache = "hit"
             return cached
 
         # Create downloads dir
@@ -157,120 +258,381 @@ class Downloader:
                 logger.info("📁 Created downloads directory")
             except Exception as e:
                 logger.error(f"❌ Cannot create downloads directory: {e}")
+                event.fail("disk")
                 return None
 
-        # Acquire per-video-ID lock to prevent duplicate concurrent downloads of the same video.
-        async with self._get_download_lock(video_id):
-            cached = _check_cache()
-            if cached:
-                return cached
+        # Coalesce concurrent downloads of the same video into one in-flight job.
+        # If a lower-priority download of it is still waiting for a slot,
+        # promote it so we don't sit behind background work.
+        key = f"{video_id}:{'video' if video else 'audio'}"
+        if self._flights.in_flight(key):
+            self._scheduler.promote(key, priority)
+            if key in self._flight_priority and priority < self._flight_priority[key]:
+                self._flight_priority[key] = priority
+            event.cache = "coalesced"
+        else:
+            self._flight_priority[key] = priority
+        result = await self._flights.do(
+            key, lambda: self._fetch_canonical(video_id, url, video, priority, key, event)
+        )
+
+        if result:
+            await self._storage.enforce_budget()
+        await self._storage.collect_partials(
+            k.split(":", 1)[0] for k in self._flights.keys()
+        )
+        self._transcoder.collect_retired()
+        return result
+
+    async def _fetch_canonical(
+        self, video_id: str, url: str, video: bool, priority: Priority, key: str,
+        event: DownloadEvent,
+    ) -> Optional[str]:
+        """_fetch(), then normalise background audio downloads in a detached task.
 
-            # **PERFORMANCE FIX**: Use semaphore to limit concurrent downloads
-            async with self._download_semaphore:
-                cookie = self._cookies.get_cookies()
-                base_opts = {
-                    "outtmpl": "downloads/%(id)s.%(ext)s",
-                    "quiet": True,
-                    "noplaylist": True,
-                    "geo_bypass": True,
-                    "no_warnings": True,
-                    "overwrites": False,
-                    "nocheckcertificate": True,
-                    "continuedl": True,
-                    "noprogress": True,
-                    "concurrent_fragment_downloads": 4,
-                    "http_chunk_size": 524288,  # 512KB chunks
-                    "socket_timeout": 30,
-                    "retries": 2,
-                    "fragment_retries": 2,
-                    "extractor_retries": 5,
-                    "sleep_interval_requests": 1,
+        The original path is returned at once, so a /play that joins or promotes
+        this flight never waits for the re-encode; later cache hits get the
+        normalised file. Tracks needed right now aren't normalised at all.
+        """
+        try:
+            path = await self._fetch(video_id, url, video, priority, key, event)
+            # A /play may have joined since the flight started
+            priority = self._flight_priority.get(key, priority)
+        finally:
+            self._flight_priority.pop(key, None)
+        if (
+            path and self._normalize and not video and priority.background
+            and media_kind(path) == "audio"
+        ):
+            self._transcoder.normalize_later(video_id, path)
+        return path
+
+    async def _fetch(
+        self, video_id: str, url: str, video: bool, priority: Priority, key: str,
+        event: DownloadEvent,
+    ) -> Optional[str]:
+        cached = self._cached(video_id, video, count=False)
+        if cached:
+            event.cache = "hit"
+            return cached
+
+        # Wait for a download slot according to priority
+        async with self._scheduler.slot(priority, key) as queue_wait:
+            event.queue_wait = queue_wait
+            cookie = event.cookie = self._cookies.get_cookies()
+            base_opts = {
+                "outtmpl": "downloads/%(id)s.%(ext)s",
+                "quiet": True,
+                "noplaylist": True,
+                "geo_bypass": True,
+                "no_warnings": True,
+                "overwrites": False,
+                "nocheckcertificate": True,
+                "continuedl": True,
+                "noprogress": True,
+                "concurrent_fragment_downloads": 4,
+                "http_chunk_size": 524288,  # 512KB chunks
+                "socket_timeout": 30,
+                "retries": 2,
+                "fragment_retries": 2,
+                "extractor_retries": 5,
+                "sleep_interval_requests": 1,
+            }
+
+            if video:
+                height_filter = ""
+                if self._max_video_height and self._max_video_height > 0:
+                    height_filter = f"[height<={self._max_video_height}]"
+                format_chain = (
+                    f"bestvideo[ext=mp4]{height_filter}+bestaudio[ext=m4a]/"
+                    f"bestvideo{height_filter}+bestaudio/"
+                    "bestvideo+bestaudio/best"
+                )
+                ydl_opts = {
+                    **base_opts,
+                    "format": format_chain,
+                    "merge_output_format": "mp4",
+                    "postprocessors": [
+                        {
+                            "key": "FFmpegVideoConvertor",
+                            "preferedformat": "mp4",
+                        }
+                    ],
                 }
+            else:
+                ydl_opts = {
+                    **base_opts,
+                    "format": "bestaudio/best",
+                    "postprocessors": [],
+                }
+
+            # Admit by the most urgent caller so far, not the one that started the flight
+            priority = self._flight_priority.get(key, priority)
+            if not await self._admit(video_id, url, ydl_opts["format"], cookie, video, priority):
+                event.fail("disk_deferred" if priority.background else "disk_full")
+                return None
+
+            resumed = event.resumed = self._storage.partial_bytes(video_id)
+            if resumed:
+                logger.info(f"⏯️ Resuming {video_id} with {resumed / 1024 ** 2:.1f}MB already on disk")
 
-                if video:
-                    height_filter = ""
-                    if self._max_video_height and self._max_video_height > 0:
-                        height_filter = f"[height<={self._max_video_height}]"
-                    format_chain = (
-                        f"bestvideo[ext=mp4]{height_filter}+bestaudio[ext=m4a]/"
-                        f"bestvideo{height_filter}+bestaudio/"
-                        "bestvideo+bestaudio/best"
+            if video and self._ranged and self._transcoder.available:
+                located = await self._fetch_ranged(video_id, url, format_chain, cookie, event)
+                if located:
+                    return located
+
+            ydl_opts_cookie = {
+                **ydl_opts,
+                "cookiefile": cookie,
+            }
+
+            try:
+                info = await self._pool.extract(url, ydl_opts_cookie, download=True)
+                if not info:
+                    logger.error(f"❌ Failed to extract info for {video_id}")
+                    event.fail("no_info")
+                    return None
+                self._tracks.put_info(info)
+                timing = info.get(TIMING_KEY) or {}
+                event.ttfb = timing.get("ttfb")
+                event.bytes = timing.get("bytes", 0)
+                event.format = info.get("format_id")
+
+                await asyncio.sleep(0.5)
+                await asyncio.to_thread(self._storage.register, video_id)
+                located = self._storage.locate_download_file(video_id, video=video)
+                if located:
+                    return located
+                logger.error(f"❌ Download completed but file not found for: {video_id}")
+                event.fail("file_missing")
+                return None
+            except yt_dlp.utils.ExtractorError as ex:
+                error_msg = str(ex)
+                self._unplayable.mark(video_id, ex)
+                if "not available" in error_msg.lower():
+                    logger.error(
+                        "❌ Video not available: May be region-blocked or private.")
+                    event.fail("unavailable")
+                elif "age" in error_msg.lower():
+                    logger.error(
+                        "❌ Age-restricted video: Cookies required.")
+                    event.fail("age_restricted")
+                else:
+                    logger.error("❌ YouTube extraction failed: %s", ex)
+                    event.fail("extractor")
+                return None
+            except yt_dlp.utils.DownloadError as ex:
+                error_msg = str(ex)
+                await asyncio.to_thread(self._storage.register, video_id)
+                recovered = self._storage.locate_download_file(video_id, video=video)
+                if "unable to rename file" in error_msg.lower() and recovered:
+                    logger.warning(
+                        f"⚠️ Renaming failed for {video_id}, using recovered file {Path(recovered).name}"
                     )
-                    ydl_opts = {
-                        **base_opts,
-                        "format": format_chain,
-                        "merge_output_format": "mp4",
-                        "postprocessors": [
-                            {
-                                "key": "FFmpegVideoConvertor",
-                                "preferedformat": "mp4",
-                            }
-                        ],
-                    }
+                    return recovered
+                if "416" in error_msg or "Requested range not satisfiable" in error_msg:
+                    logger.warning(f"⚠️ Range error for {video_id}, skipping")
+                    event.fail("range")
                 else:
-                    ydl_opts = {
-                        **base_opts,
-                        "format": "bestaudio/best",
-                        "postprocessors": [],
-                    }
-
-                ydl_opts_cookie = {
-                    **ydl_opts,
-                    "cookiefile": cookie,
-                }
+                    logger.warning(f"⚠️ Download error for {video_id}: {ex}")
+                    if recovered:
+                        logger.warning(
+                            f"⚠️ Using recovered file for {video_id} despite download error"
+                        )
+                        return recovered
+                    # yt-dlp wraps "Private video" and friends in DownloadError too
+                    reason = self._unplayable.mark(video_id, ex)
+                    event.fail(reason or ("timeout" if "timed out" in error_msg.lower() else "download"))
+                return None
+            except Exception as ex:
+                logger.warning(f"⚠️ Unexpected download error for {video_id}: {ex}")
+                event.fail("unexpected")
+                return None
 
-                def _download(ydl_runtime_opts):
-                    ydl_instance = None
-                    try:
-                        ydl_instance = yt_dlp.YoutubeDL(ydl_runtime_opts)
-                        info = ydl_instance.extract_info(url, download=True)
-                        if not info:
-                            logger.error(f"❌ Failed to extract info for {video_id}")
-                            return None
-
-                        time.sleep(0.5)
-                        located = self._storage.locate_download_file(video_id, video=video)
-                        if located:
-                            return located
-                        logger.error(f"❌ Download completed but file not found for: {video_id}")
-                        return None
-                    except yt_dlp.utils.ExtractorError as ex:
-                        error_msg = str(ex)
-                        if "not available" in error_msg.lower():
-                            logger.error(
-                                "❌ Video not available: May be region-blocked or private.")
-                        elif "age" in error_msg.lower():
-                            logger.error(
-                                "❌ Age-restricted video: Cookies required.")
-                        else:
-                            logger.error("❌ YouTube extraction failed: %s", ex)
-                        return None
-                    except yt_dlp.utils.DownloadError as ex:
-                        error_msg = str(ex)
-                        recovered = self._storage.locate_download_file(video_id, video=video)
-                        if "unable to rename file" in error_msg.lower() and recovered:
-                            logger.warning(
-                                f"⚠️ Renaming failed for {video_id}, using recovered file {Path(recovered).name}"
-                            )
-                            return recovered
-                        if "416" in error_msg or "Requested range not satisfiable" in error_msg:
-                            logger.warning(f"⚠️ Range error for {video_id}, skipping")
-                        else:
-                            logger.warning(f"⚠️ Download error for {video_id}: {ex}")
-                            if recovered:
-                                logger.warning(
-                                    f"⚠️ Using recovered file for {video_id} despite download error"
-                                )
-                                return recovered
-                        return None
-                    except Exception as ex:
-                        logger.warning(f"⚠️ Unexpected download error for {video_id}: {ex}")
-                        return None
-                    finally:
-                        if ydl_instance:
-                            try:
-                                ydl_instance.close()
-                            except Exception:
-                                pass
-
-                return await asyncio.to_thread(_download, ydl_opts_cookie)
+    async def _admit(
+        self, video_id: str, url: str, fmt: str, cookie: Optional[str], video: bool, priority: Priority
+    ) -> bool:
+        """Disk admission control. Only looks up the real file size when space is tight."""
+        estimate = VIDEO_SIZE_ESTIMATE if video else AUDIO_SIZE_ESTIMATE
+        if not await asyncio.to_thread(self._storage.low_on_space, estimate):
+            return True
+        expected = (
+            self._known_size(video_id, video)
+            or await self._expected_size(url, fmt, cookie)
+            or estimate
+        )
+        return await self._storage.admit(expected, priority.background)
+
+    def _known_size(self, video_id: str, video: bool) -> Optional[int]:
+        """Size of the formats we would pick, from formats already in the track store."""
+        def size(f: dict) -> int:
+            return f.get("filesize") or f.get("filesize_approx") or 0
+
+        formats = [f for f in self._tracks.formats(video_id) if size(f)]
+        audio = max(
+            (f for f in formats if f.get("vcodec") == "none" and f.get("acodec") not in (None, "none")),
+            key=lambda f: f.get("abr") or 0,
+            default=None,
+        )
+        if not video:
+            return size(audio) if audio else None
+        best = max(
+            (
+                f for f in formats
+                if f.get("vcodec") not in (None, "none")
+                and (not self._max_video_height or (f.get("height") or 0) <= self._max_video_height)
+            ),
+            key=lambda f: (f.get("height") or 0, size(f)),
+            default=None,
+        )
+        if not best:
+            return None
+        return size(best) + (size(audio) if audio and best.get("acodec") in (None, "none") else 0)
+
+    async def _expected_size(self, url: str, fmt: str, cookie: Optional[str]) -> Optional[int]:
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "noplaylist": True,
+            "cookiefile": cookie,
+            "format": fmt,
+            "socket_timeout": 20,
+        }
+        try:
+            info = await self._pool.extract(url, opts)
+        except Exception:
+            return None
+        if info:
+            self._tracks.put_info(info)
+        formats = (info or {}).get("requested_formats") or ([info] if info else [])
+        total = sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in formats)
+        return total or None
+
+    async def _fetch_ranged(
+        self, video_id: str, url: str, format_chain: str, cookie: Optional[str],
+        event: DownloadEvent,
+    ) -> Optional[str]:
+        """Download the selected video/audio formats with parallel range requests.
+
+        Only plain HTTP formats with a known size qualify; anything else (DASH
+        fragments, HLS, unknown size) returns None and yt-dlp downloads it instead.
+        """
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "noplaylist": True,
+            "cookiefile": cookie,
+            "format": format_chain,
+            "socket_timeout": 30,
+        }
+        try:
+            info = await self._pool.extract(url, opts)
+        except Exception as e:
+            logger.debug(f"Ranged download skipped for {video_id}: {e}")
+            return None
+        formats = (info or {}).get("requested_formats") or ([info] if info else [])
+        if not formats or any(
+            f.get("protocol") not in ("http", "https") or not f.get("filesize") or not f.get("url")
+            for f in formats
+        ):
+            return None
+
+        parts = []
+        for fmt in formats:
+            dest = f"downloads/{video_id}.f{fmt.get('format_id')}.{fmt.get('ext')}{PART_EXT}"
+            if not await self._ranged.fetch(fmt["url"], dest, fmt["filesize"], fmt.get("http_headers")):
+                return None
+            parts.append(dest)
+
+        located = await self._transcoder.merge(video_id, parts)
+        await asyncio.to_thread(self._storage.register, video_id)
+        if located:
+            event.format = "+".join(str(f.get("format_id")) for f in formats)
+            event.bytes = sum(f["filesize"] for f in formats)
+            logger.info(f"📥 Fetched video {video_id} over {self._ranged.connections} connections")
+        return located
+
+    def warm(self, video_id: str) -> None:
+        """Start fetching a track nobody has asked to play yet, at the lowest priority."""
+        if (
+            not re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id)
+            or video_id in self._warming
+            or self._unplayable.get(video_id, count=False)
+            or self._storage.find_cached(video_id, count=False)
+        ):
+            return
+        task = asyncio.create_task(self._warm(video_id))
+        self._warming[video_id] = task
+        task.add_done_callback(lambda _, v=video_id: self._warming.pop(v, None))
+
+    async def _warm(self, video_id: str) -> None:
+        try:
+            await self.fetch(video_id, priority=Priority.SPECULATIVE)
+        except Exception as e:
+            logger.debug(f"Warm-up fetch failed for {video_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "downloads": self.telemetry.summary(),
+            "scheduler": self._scheduler.stats(),
+            "in_flight": self._flights.stats(),
+            "warming": len(self._warming),
+        }
+
+    # --- Progressive playback ---
+    def _buffered_part(self, video_id: str) -> Optional[str]:
+        for ext in AUDIO_EXTS:
+            part = f"downloads/{video_id}{ext}.part"
+            try:
+                if os.path.getsize(part) >= self._buffer_bytes:
+                    return part
+            except OSError:
+                continue
+        return None
+
+    async def download_progressive(
+        self, video_id: str, priority: Priority = Priority.NOW_PLAYING
+    ) -> Optional[str]:
+        """Start an audio download and return as soon as enough of it is on disk.
+
+        Returns the final file if the track is cached or finishes quickly, otherwise the
+        growing ".part" file. The download keeps running in the background; use
+        settle_progressive() to get the finished file.
+        """
+        if not re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id):
+            return await self.download(video_id, priority=priority)
+
+        cached = self._cached(video_id)
+        if cached:
+            return cached
+
+        task = asyncio.ensure_future(self.download(video_id, priority=priority))
+        while not task.done():
+            part = self._buffered_part(video_id)
+            if part:
+                self._progressive[part] = task
+                while len(self._progressive) > 256:
+                    self._progressive.popitem(last=False)
+                logger.info(f"▶️ Streaming {video_id} while it downloads")
+                return part
+            await asyncio.wait({task}, timeout=0.25)
+        return task.result()
+
+    def is_progressive(self, path: Optional[str]) -> bool:
+        return bool(path) and path in self._progressive
+
+    async def settle_progressive(self, path: Optional[str], wait: bool = False) -> Optional[str]:
+        """Swap a progressive ".part" path for the finished file.
+
+        Returns the path unchanged if it isn't progressive, or if the download is still
+        running and wait is False. Returns None if the background download failed.
+        """
+        task = self._progressive.get(path) if path else None
+        if task is None:
+            return path
+        if not task.done() and not wait:
+            return path
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            return None
@@ -0,0 +1,168 @@
+# ==============================================================================
+# fake.py - Offline Extractor Backend
+# ==============================================================================
+# Drop-in stand-in for ExtractorPool that never touches the network. Used by
+# bench/pipeline.py to measure the search/download pipeline offline.
+# Features:
+# - Deterministic metadata for searches, watch URLs and playlists
+# - Writes local media files (generated bytes or a copy of a sample file)
+# - Configurable per-call latency and per-download bandwidth
+# - Optional deterministic failure rate
+# ==============================================================================
+
+import asyncio
+import base64
+import hashlib
+import os
+import time
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import yt_dlp
+
+from .worker import TIMING_KEY
+
+WRITE_CHUNK = 64 * 1024
+
+
+def fake_id(seed: str) -> str:
+    """Stable 11-character YouTube-style ID for any string."""
+    digest = hashlib.sha1(seed.encode()).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:11]
+
+
+class FakeExtractor:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        bandwidth: int = 5 * 1024 * 1024,
+        media_size: int = 256 * 1024,
+        media_file: Optional[str] = None,
+        fail_rate: float = 0.0,
+    ):
+        self.latency = latency          # seconds per extraction call
+        self.bandwidth = bandwidth      # bytes/sec per download (0 = instant)
+        self.media_size = media_size    # bytes written per generated file
+        self.media_file = media_file    # copy this file instead of generating bytes
+        self.fail_rate = fail_rate
+        self.on_result: Optional[Callable[[Optional[str], bool, str], None]] = None
+        self.size = 0
+        self.calls = 0
+        self.searches = 0
+        self.downloads = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    # --- Metadata ---
+    def _entry(self, video_id: str) -> dict:
+        n = int.from_bytes(hashlib.sha1(video_id.encode()).digest()[:4], "big")
+        return {
+            "id": video_id,
+            "title": f"Fake Track {video_id}",
+            "uploader": f"Channel {n % 97}",
+            "duration": 120 + n % 240,
+            "view_count": n % 1_000_000,
+            "is_live": False,
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+            "thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}],
+            "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+            "ext": "m4a",
+            "format_id": "140",
+            "protocol": "https",
+            "filesize": self.media_size,
+        }
+
+    def _fails(self, video_id: str) -> bool:
+        if self.fail_rate <= 0:
+            return False
+        n = int.from_bytes(hashlib.sha1(b"fail" + video_id.encode()).digest()[:4], "big")
+        return (n % 10_000) / 10_000 < self.fail_rate
+
+    def _info(self, url: str) -> dict:
+        if url.startswith("ytsearch"):
+            prefix, _, query = url.partition(":")
+            count = int(prefix[len("ytsearch"):] or 1)
+            self.searches += 1
+            return {"entries": [self._entry(fake_id(f"{query}#{i}")) for i in range(count)]}
+        params = parse_qs(urlparse(url).query)
+        if "list" in params and "v" not in params:
+            playlist = params["list"][0]
+            return {"entries": [self._entry(fake_id(f"{playlist}#{i}")) for i in range(25)]}
+        video_id = params.get("v", [None])[0] or fake_id(url)
+        return self._entry(video_id)
+
+    # --- Downloads ---
+    def _write(self, path: str) -> int:
+        part = path + ".part"
+        with open(part, "wb") as out:
+            if self.media_file:
+                with open(self.media_file, "rb") as src:
+                    while chunk := src.read(WRITE_CHUNK):
+                        out.write(chunk)
+            else:
+                seed = hashlib.sha1(path.encode()).digest()
+                block = (seed * (WRITE_CHUNK // len(seed) + 1))[:WRITE_CHUNK]
+                remaining = self.media_size
+                while remaining > 0:
+                    out.write(block[:remaining])
+                    remaining -= WRITE_CHUNK
+        size = os.path.getsize(part)
+        os.replace(part, path)
+        return size
+
+    async def _download(self, info: dict, opts: dict) -> dict:
+        template = opts.get("outtmpl", "downloads/%(id)s.%(ext)s")
+        ext = "mp4" if "bestvideo" in str(opts.get("format", "")) else info["ext"]
+        path = template % {"id": info["id"], "ext": ext}
+        started = time.monotonic()
+        if self.bandwidth:
+            await asyncio.sleep(self.media_size / self.bandwidth)
+        size = await asyncio.to_thread(self._write, path)
+        self.downloads += 1
+        return {
+            **info,
+            "ext": ext,
+            TIMING_KEY: {"ttfb": 0.0, "bytes": size, "seconds": time.monotonic() - started},
+        }
+
+    async def extract(self, url: str, opts: dict, download: bool = False) -> Optional[dict]:
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(self.latency)
+            info = self._info(url)
+            if "id" in info and self._fails(info["id"]):
+                self.failed += 1
+                raise yt_dlp.utils.DownloadError(f"ERROR: [youtube] {info['id']}: Video unavailable")
+            if download and "id" in info:
+                info = await self._download(info, opts)
+        except Exception as e:
+            if self.on_result:
+                self.on_result(opts.get("cookiefile"), False, str(e))
+            raise
+        finally:
+            self.busy_seconds += time.monotonic() - started
+        if self.on_result:
+            self.on_result(opts.get("cookiefile"), True, "")
+        return info
+
+    async def close(self) -> None:
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "workers": 0,
+            "queue_depth": 0,
+            "running": 0,
+            "completed": self.calls - self.failed,
+            "failed": self.failed,
+            "recycled": 0,
+            "avg_job_seconds": round(self.busy_seconds / max(1, self.calls), 3),
+            "searches": self.searches,
+            "downloads": self.downloads,
+        }
@@ -0,0 +1,91 @@
+# ==============================================================================
+# hedge.py - Hedged Requests
+# ==============================================================================
+# This file cuts the tail latency of searches. yt-dlp sometimes hangs for
+# many seconds on one cookie or connection while a second attempt would
+# answer at once, so a request that runs past the usual p95 latency gets a
+# second, hedged attempt and whichever answers first wins.
+# Features:
+# - Threshold follows the p95 of recent successful requests
+# - Hedges are capped to a share of all requests, so YouTube traffic grows
+#   by at most that much even when everything is slow
+# - The slower attempt is cancelled as soon as one answers
+# - A failed attempt doesn't end the request while the other may succeed
+# ==============================================================================
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from HasiiMusic import config
+
+T = TypeVar("T")
+
+WINDOW = 200  # recent requests the threshold and hedge rate are measured over
+MIN_SAMPLES = 20  # successful requests needed before the p95 means anything
+
+
+class Hedger:
+    def __init__(self):
+        self.max_rate = max(0.0, getattr(config, "SEARCH_HEDGE_RATE", 0.05))
+        self.min_delay = getattr(config, "SEARCH_HEDGE_MIN_MS", 500) / 1000
+        self._latencies: deque = deque(maxlen=WINDOW)
+        self._hedged: deque = deque(maxlen=WINDOW)  # one bool per request
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def threshold(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        if len(self._latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(self.min_delay, p95)
+
+    def _may_hedge(self) -> bool:
+        return (sum(self._hedged) + 1) / (len(self._hedged) + 1) <= self.max_rate
+
+    async def run(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Await attempt(), starting a second attempt() if the first runs past the
+        threshold. Returns the first result; raises only if every attempt failed."""
+        self.requests += 1
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(attempt())]
+        try:
+            threshold = self.threshold() if self.max_rate > 0 else None
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                if not done and self._may_hedge():
+                    self.hedges += 1
+                    tasks.append(asyncio.ensure_future(attempt()))
+            self._hedged.append(len(tasks) > 1)
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        self._latencies.append(time.monotonic() - started)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark the loser's error as seen
+
+    def stats(self) -> dict:
+        threshold = self.threshold()
+        return {
+            "threshold_ms": round(threshold * 1000) if threshold is not None else None,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(sum(self._hedged) / len(self._hedged), 3) if self._hedged else 0.0,
+        }
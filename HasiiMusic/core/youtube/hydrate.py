@@ -0,0 +1,89 @@
+# ==============================================================================
+# hydrate.py - Playlist Metadata Hydration
+# ==============================================================================
+# Flat playlist extraction is fast but leaves tracks without thumbnails and
+# often without durations. This file fills them in the background right
+# after a playlist is queued, so track changes never wait on a search.
+# Features:
+# - Bounded concurrency (PLAYLIST_HYDRATE_CONCURRENCY extractions at once)
+# - Tracks are updated in place, so queued items pick the data up directly
+# - Reads through the track metadata store, then the search cache and
+#   single-flight:
+#   a track being hydrated and the same track starting to play share one
+#   extraction
+# ==============================================================================
+
+import asyncio
+import re
+from typing import Iterable, Set
+from HasiiMusic import config, logger
+
+from .metadata import is_complete
+
+
+class PlaylistHydrator:
+    def __init__(self, searcher, tracks):
+        self._searcher = searcher
+        self._tracks = tracks
+        self._slots = asyncio.Semaphore(max(1, getattr(config, "PLAYLIST_HYDRATE_CONCURRENCY", 4)))
+        self._tasks: Set[asyncio.Task] = set()
+        self.pending = 0
+        self.hydrated = 0
+        self.failed = 0
+
+    @staticmethod
+    def needs(track) -> bool:
+        return bool(re.fullmatch(r"[A-Za-z0-9_-]{11}", track.id or "")) and not is_complete(track)
+
+    async def hydrate_track(self, track) -> bool:
+        """Fill in a track's missing thumbnail, duration and channel. Returns False
+        if its metadata could not be found."""
+        if not self.needs(track):
+            return True
+        if await self._tracks.fill(track):
+            self.hydrated += 1
+            return True
+        info = await self._searcher.search(f"https://www.youtube.com/watch?v={track.id}", 0)
+        if not info:
+            self.failed += 1
+            return False
+        if info.thumbnail:
+            track.thumbnail = info.thumbnail
+        if info.duration_sec:
+            track.duration_sec = info.duration_sec
+            track.duration = info.duration
+        if not track.channel_name:
+            track.channel_name = info.channel_name
+        track.is_live = track.is_live or info.is_live
+        self.hydrated += 1
+        return True
+
+    def hydrate(self, tracks: Iterable) -> None:
+        """Hydrate tracks in the background, in queue order."""
+        pending = [track for track in tracks if self.needs(track)]
+        if not pending:
+            return
+        self.pending += len(pending)
+        task = asyncio.create_task(self._hydrate_all(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _hydrate_all(self, tracks: list) -> None:
+        async def _one(track) -> None:
+            async with self._slots:
+                try:
+                    await self.hydrate_track(track)
+                except Exception as e:
+                    self.failed += 1
+                    logger.debug(f"Could not hydrate {track.id}: {e}")
+                finally:
+                    self.pending -= 1
+
+        await asyncio.gather(*(_one(track) for track in tracks))
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "hydrated": self.hydrated,
+            "failed": self.failed,
+        }
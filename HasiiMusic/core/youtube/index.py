@@ -0,0 +1,274 @@
+# ==============================================================================
+# index.py - Download Cache Index
+# ==============================================================================
+# This file keeps an in-memory index of the media stored in downloads/.
+# Features:
+# - Builds the index once at startup with a single directory scan
+# - O(1) lookups keyed by (video_id, kind) instead of glob scans
+# - Tracks size and last access time of every cached file
+# - Knows which audio files are already in the canonical playback format
+# - Tracks partial downloads (.part files, unmerged formats, ranged chunks)
+#   so they can be resumed or garbage-collected
+# - Optionally follows external changes to downloads/ through inotify
+# ==============================================================================
+
+import os
+import re
+import time
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from HasiiMusic import logger
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    HAVE_INOTIFY = True
+except ImportError:
+    HAVE_INOTIFY = False
+
+VIDEO_EXTS = {".mp4", ".mkv", ".mov"}
+AUDIO_EXTS = {".m4a", ".webm", ".opus", ".mp3", ".ogg", ".wav", ".flac"}
+TEMP_EXTS = (".part", ".ytdl", ".info.json", ".temp", ".ranged", ".chunks")
+CANONICAL_EXT = ".opus"  # audio normalised to Ogg/Opus 48 kHz stereo by the transcoder
+VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+
+
+def media_kind(path: str) -> Optional[str]:
+    """Return "audio" or "video" for a cached media path, None for anything else."""
+    suffix = Path(path).suffix.lower()
+    if suffix in VIDEO_EXTS:
+        return "video"
+    if suffix in AUDIO_EXTS:
+        return "audio"
+    return None
+
+
+@dataclass
+class CachedFile:
+    path: str
+    size: int
+    last_access: float
+    hits: int = 0
+
+    @property
+    def canonical(self) -> bool:
+        """True if this is audio already normalised to the canonical playback format."""
+        return self.path.endswith(CANONICAL_EXT)
+
+
+@dataclass
+class PartialFile:
+    path: str
+    size: int
+    modified: float
+
+
+class MediaIndex:
+    def __init__(self, directory: str = "downloads"):
+        self.directory = directory
+        self._entries: Dict[Tuple[str, str], CachedFile] = {}
+        self._total = 0
+        self._partials: Dict[str, Dict[str, PartialFile]] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _parse(name: str) -> Optional[Tuple[str, str]]:
+        # Only final "<id>.<ext>" files are indexed; yt-dlp intermediates
+        # such as "<id>.f137.mp4" or "<id>.m4a.part" are ignored.
+        if name.endswith(TEMP_EXTS) or name.count(".") != 1:
+            return None
+        kind = media_kind(name)
+        if not kind:
+            return None
+        return name.split(".", 1)[0], kind
+
+    @classmethod
+    def _partial_id(cls, name: str) -> Optional[str]:
+        """Video ID of a leftover download intermediate ("<id>.m4a.part",
+        "<id>.f137.mp4", "<id>.f137.mp4.ranged", ...), None for anything else."""
+        video_id, dot, _ = name.partition(".")
+        if not dot or not VIDEO_ID.fullmatch(video_id) or cls._parse(name):
+            return None
+        return video_id
+
+    def build(self) -> None:
+        """Scan the downloads directory once and replace the index contents."""
+        entries: Dict[Tuple[str, str], CachedFile] = {}
+        partials: Dict[str, Dict[str, PartialFile]] = {}
+        started = time.monotonic()
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    parsed = self._parse(entry.name)
+                    partial_id = None if parsed else self._partial_id(entry.name)
+                    if not (parsed or partial_id) or not entry.is_file():
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    path = f"{self.directory}/{entry.name}"
+                    if partial_id:
+                        partials.setdefault(partial_id, {})[path] = PartialFile(
+                            path, st.st_size, st.st_mtime
+                        )
+                        continue
+                    previous = entries.get(parsed)
+                    if previous and previous.canonical:
+                        # left behind next to its normalised copy; keep the canonical one
+                        continue
+                    entries[parsed] = CachedFile(path, st.st_size, max(st.st_atime, st.st_mtime))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._entries = entries
+            self._total = sum(cached.size for cached in entries.values())
+            self._partials = partials
+        logger.info(
+            f"🗂️ Indexed {len(entries)} cached file(s) and {len(partials)} partial download(s) "
+            f"in {time.monotonic() - started:.2f}s."
+        )
+
+    def add(self, path: str) -> Optional[CachedFile]:
+        """Record (or refresh) a file in the index. Returns the entry, or None if not indexable."""
+        parsed = self._parse(os.path.basename(path))
+        if not parsed:
+            return None
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            self.discard(path)
+            return None
+        cached = CachedFile(path, size, time.time())
+        with self._lock:
+            previous = self._entries.get(parsed)
+            if (
+                previous and previous.canonical and not cached.canonical
+                and previous.path != path and os.path.exists(previous.path)
+            ):
+                # An original left next to its normalised copy; keep the canonical one
+                return previous
+            if previous:
+                self._total -= previous.size
+                if previous.path == path:
+                    cached.hits = previous.hits
+            self._entries[parsed] = cached
+            self._total += size
+        return cached
+
+    def discard(self, path: str) -> None:
+        """Drop a path from the index (the file itself is left alone)."""
+        name = os.path.basename(path)
+        parsed = self._parse(name)
+        if not parsed:
+            partial_id = self._partial_id(name)
+            if partial_id:
+                with self._lock:
+                    files = self._partials.get(partial_id)
+                    if files and files.pop(path, None) and not files:
+                        del self._partials[partial_id]
+            return
+        with self._lock:
+            current = self._entries.get(parsed)
+            if current and current.path == path:
+                del self._entries[parsed]
+                self._total -= current.size
+
+    def get(self, video_id: str, kind: str) -> Optional[CachedFile]:
+        with self._lock:
+            return self._entries.get((video_id, kind))
+
+    def get_path(self, path: str) -> Optional[CachedFile]:
+        """Return the entry for path if it is the file currently indexed for its ID."""
+        parsed = self._parse(os.path.basename(path))
+        cached = self.get(*parsed) if parsed else None
+        return cached if cached and cached.path == path else None
+
+    def touch(self, video_id: str, kind: str) -> None:
+        with self._lock:
+            cached = self._entries.get((video_id, kind))
+            if cached:
+                cached.last_access = time.time()
+                cached.hits += 1
+
+    # --- Partial downloads ---
+    def set_partials(self, video_id: str, paths: List[str]) -> None:
+        """Replace the partial files recorded for video_id with the given paths."""
+        partials: Dict[str, PartialFile] = {}
+        for path in paths:
+            if self._partial_id(os.path.basename(path)) != video_id:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            partials[path] = PartialFile(path, st.st_size, st.st_mtime)
+        with self._lock:
+            if partials:
+                self._partials[video_id] = partials
+            else:
+                self._partials.pop(video_id, None)
+
+    def partials(self, video_id: str) -> List[PartialFile]:
+        with self._lock:
+            return list(self._partials.get(video_id, {}).values())
+
+    def all_partials(self) -> List[Tuple[str, List[PartialFile]]]:
+        """Snapshot of (video_id, partial files) for every partially downloaded video."""
+        with self._lock:
+            return [(video_id, list(files.values())) for video_id, files in self._partials.items()]
+
+    def items(self) -> Iterator[Tuple[Tuple[str, str], CachedFile]]:
+        """Snapshot of all entries, safe to iterate while the index changes."""
+        with self._lock:
+            return iter(list(self._entries.items()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    # --- inotify ---
+    def watch(self) -> bool:
+        """Follow changes made to downloads/ outside the bot. Returns False if unavailable."""
+        if not HAVE_INOTIFY:
+            logger.warning("inotify_simple is not installed; download index will not watch the filesystem.")
+            return False
+        if self._watcher and self._watcher.is_alive():
+            return True
+        self._watcher = threading.Thread(
+            target=self._watch_loop, name="download-index-watch", daemon=True
+        )
+        self._watcher.start()
+        return True
+
+    def _watch_loop(self) -> None:
+        try:
+            inotify = INotify()
+            mask = (
+                inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                | inotify_flags.DELETE | inotify_flags.MOVED_FROM
+            )
+            inotify.add_watch(self.directory, mask)
+        except OSError as e:
+            logger.warning(f"Could not watch {self.directory}/ for changes: {e}")
+            return
+
+        logger.info(f"👀 Watching {self.directory}/ for cache changes.")
+        while True:
+            try:
+                for event in inotify.read():
+                    if not event.name:
+                        continue
+                    path = f"{self.directory}/{event.name}"
+                    if event.mask & (inotify_flags.DELETE | inotify_flags.MOVED_FROM):
+                        self.discard(path)
+                    else:
+                        self.add(path)
+            except Exception as e:
+                logger.debug(f"Download index watcher error: {e}")
+                time.sleep(1)
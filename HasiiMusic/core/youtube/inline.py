@@ -0,0 +1,154 @@
+# ==============================================================================
+# inline.py - Inline Query Search
+# ==============================================================================
+# This file answers inline queries (@botname <text>) without running one
+# extraction per keystroke.
+# Features:
+# - Per-user debounce: only the query the user stopped typing at is searched
+# - Result cache keyed by the folded query text
+# - Prefix cache: "shape of yo" is answered from the results of "shape of"
+#   when enough of them still match
+# - Superseded queries give up their queued extraction instead of running it
+# - Identical concurrent queries from different users share one extraction
+# - Every result lands in the track metadata store, so playing it later
+#   needs no further extraction
+# ==============================================================================
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from HasiiMusic import config, logger
+from HasiiMusic.helpers import SingleFlight
+
+RESULTS = 15  # entries fetched per inline search
+CACHE_SIZE = 256
+PREFIX_MIN_CHARS = 3  # shortest cached prefix worth filtering
+PREFIX_MIN_RESULTS = 5  # matches a prefix needs to answer on its own
+
+
+def _fold(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class InlineSearcher:
+    def __init__(self, cookies_manager, pool, tracks):
+        self._cookies = cookies_manager
+        self._pool = pool
+        self._tracks = tracks
+        self.debounce = getattr(config, "INLINE_DEBOUNCE_MS", 400) / 1000
+        self.ttl = getattr(config, "INLINE_CACHE_TIME", 300)
+        self._results: OrderedDict[str, Tuple[List[dict], float]] = OrderedDict()
+        self._flights = SingleFlight()
+        # {user_id: event set when the user's newer query replaces the current one}
+        self._superseded: Dict[int, asyncio.Event] = {}
+        self.cache_hits = 0
+        self.prefix_hits = 0
+        self.superseded = 0
+        self.extractions = 0
+
+    # --- Result cache ---
+    def _cached(self, key: str) -> Optional[List[dict]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        entries, expires = entry
+        if time.monotonic() >= expires:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entries
+
+    def _store(self, key: str, entries: List[dict]) -> None:
+        self._results[key] = (entries, time.monotonic() + self.ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    def _from_prefix(self, key: str) -> Optional[List[dict]]:
+        """Filter the results of the longest cached prefix of key down to the ones
+        that still match every word typed so far."""
+        words = key.split()
+        for end in range(len(key) - 1, PREFIX_MIN_CHARS - 1, -1):
+            entries = self._cached(key[:end].rstrip())
+            if entries is None:
+                continue
+            matches = [
+                e for e in entries
+                if all(w in _fold(f"{e.get('title') or ''} {e.get('uploader') or ''}") for w in words)
+            ]
+            return matches if len(matches) >= PREFIX_MIN_RESULTS else None
+        return None
+
+    # --- Search ---
+    async def search(self, user_id: int, text: str) -> Optional[List[dict]]:
+        """Return search entries for an inline query, or None if there is nothing
+        to answer (no results, or the user already typed something newer)."""
+        key = _fold(text)
+        if not key:
+            return None
+
+        entries = self._cached(key)
+        if entries is not None:
+            self.cache_hits += 1
+            return entries
+        entries = self._from_prefix(key)
+        if entries is not None:
+            self.prefix_hits += 1
+            return entries
+
+        previous = self._superseded.get(user_id)
+        if previous:
+            previous.set()
+        superseded = self._superseded[user_id] = asyncio.Event()
+        try:
+            # Wait for the user to stop typing; a newer keystroke supersedes us
+            try:
+                await asyncio.wait_for(superseded.wait(), timeout=self.debounce)
+            except asyncio.TimeoutError:
+                pass
+            if superseded.is_set():
+                self.superseded += 1
+                return None
+
+            search = asyncio.ensure_future(self._flights.do(key, lambda: self._extract(key)))
+            waiter = asyncio.ensure_future(superseded.wait())
+            await asyncio.wait({search, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if not search.done():
+                # Leaving the flight cancels the extraction if nobody else waits for it
+                search.cancel()
+                self.superseded += 1
+                return None
+            return search.result() or None
+        finally:
+            if self._superseded.get(user_id) is superseded:
+                del self._superseded[user_id]
+
+    async def _extract(self, key: str) -> List[dict]:
+        self.extractions += 1
+        opts = {
+            "quiet": True,
+            "extract_flat": True,
+            "cookiefile": self._cookies.get_cookies(),
+        }
+        try:
+            results = await self._pool.extract(f"ytsearch{RESULTS}:{key}", opts)
+        except Exception as e:
+            logger.debug(f"Inline search failed for '{key}': {e}")
+            return []
+        entries = [e for e in (results or {}).get("entries") or [] if e]
+        if entries:
+            self._store(key, entries)
+            for entry in entries:
+                self._tracks.put_info(entry)
+        return entries
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._results),
+            "cache_hits": self.cache_hits,
+            "prefix_hits": self.prefix_hits,
+            "superseded": self.superseded,
+            "extractions": self.extractions,
+        }
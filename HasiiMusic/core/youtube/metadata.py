@@ -0,0 +1,259 @@
+# ==============================================================================
+# metadata.py - Track Metadata Store
+# ==============================================================================
+# This file keeps the metadata of every video the bot has already seen, so
+# a track found once (by /play, an inline query, a search or a download)
+# never needs another extraction just to be described, queued, preloaded or
+# drawn on a thumbnail.
+# Features:
+# - Keyed by YouTube video ID
+# - LRU memory tier with a TTL, O(1) lookups and evictions
+# - Persistent MongoDB tier that survives restarts (expired by a TTL index)
+# - Merges what each source knows: a flat search entry never wipes the
+#   thumbnail or duration a full extraction found earlier
+# - Keeps a compact list of the video's formats (sizes, codecs, heights)
+# - Builds Track objects from yt-dlp info dicts and flat search entries
+# ==============================================================================
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields, replace
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+from HasiiMusic import config, logger
+from HasiiMusic.helpers import Track, utils
+
+from .search_cache import DB_BACKOFF, DB_TIMEOUT
+
+# Format fields worth keeping; enough to estimate download sizes without yt-dlp
+_FORMAT_FIELDS = ("format_id", "ext", "acodec", "vcodec", "abr", "height", "filesize", "filesize_approx")
+# Per-request fields that must never leak into another chat's queue
+_REQUEST_FIELDS = {
+    "file_path": None, "message_id": 0, "time": 0, "user": None, "video": False,
+    "playlist_name": None, "playlist_url": None, "playlist_type": None, "playlist_index": 0,
+}
+_TRACK_FIELDS = {f.name for f in fields(Track)}
+
+
+def is_complete(track: Optional[Track]) -> bool:
+    """True if track has everything the player and thumbnails need."""
+    return bool(track and track.thumbnail and (track.duration_sec or track.is_live))
+
+
+def track_from_info(data: dict) -> Optional[Track]:
+    """Build a Track from a yt-dlp info dict or flat search/playlist entry."""
+    video_id = data.get("id") or ""
+    if not re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id):
+        return None
+    duration_sec = data.get("duration")
+    is_live = bool(data.get("is_live") or data.get("live_status") == "is_live")
+    if duration_sec is None and is_live:
+        duration = "LIVE"
+        duration_sec = 0
+    else:
+        duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
+    thumbnail = data.get("thumbnail") or (
+        data.get("thumbnails", [{}])[-1].get("url", "").split("?")[0] if data.get("thumbnails") else ""
+    )
+    return Track(
+        id=video_id,
+        channel_name=data.get("uploader") or data.get("channel") or "",
+        duration=duration,
+        duration_sec=int(duration_sec) if duration_sec else 0,
+        title=(data.get("title") or "")[:25],
+        thumbnail=thumbnail,
+        url=data.get("webpage_url") or f"https://www.youtube.com/watch?v={video_id}",
+        view_count=str(data.get("view_count") or ""),
+        is_live=is_live,
+    )
+
+
+def _formats_from_info(data: dict) -> List[dict]:
+    return [
+        {k: f[k] for k in _FORMAT_FIELDS if f.get(k) is not None}
+        for f in data.get("formats") or []
+        if f.get("format_id")
+    ]
+
+
+def _merge(old: Track, new: Track) -> Track:
+    """new, with any field it left empty taken from old."""
+    return replace(new, **{
+        name: getattr(old, name)
+        for name in ("channel_name", "duration", "duration_sec", "title", "thumbnail", "view_count")
+        if not getattr(new, name) or getattr(new, name) == "0:00"
+    })
+
+
+@dataclass
+class _Entry:
+    track: Track
+    expires: float
+    formats: List[dict] = field(default_factory=list)
+
+
+class TrackStore:
+    def __init__(self):
+        self.size = max(1, getattr(config, "TRACK_STORE_SIZE", 5000))
+        self.ttl = getattr(config, "TRACK_STORE_TTL_HOURS", 24) * 3600
+        self.db_ttl = getattr(config, "TRACK_STORE_DB_TTL_HOURS", 168) * 3600
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._writes: Set[asyncio.Task] = set()
+        self._db_down_until = 0.0
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.db_errors = 0
+
+    @staticmethod
+    def _collection():
+        from HasiiMusic import db
+
+        return db.trackdb
+
+    def _db_usable(self) -> bool:
+        return self.db_ttl > 0 and time.monotonic() >= self._db_down_until
+
+    def _db_failed(self, action: str, error: Exception) -> None:
+        self.db_errors += 1
+        self._db_down_until = time.monotonic() + DB_BACKOFF
+        logger.debug(f"Track store {action} failed, skipping the database for {DB_BACKOFF}s: {error!r}")
+
+    # --- Memory tier ---
+    def _entry(self, video_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(video_id)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires:
+            del self._entries[video_id]
+            return None
+        self._entries.move_to_end(video_id)
+        return entry
+
+    def _remember(self, video_id: str, track: Track, formats: List[dict]) -> None:
+        self._entries[video_id] = _Entry(track, time.monotonic() + self.ttl, formats)
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get(self, video_id: str) -> Optional[Track]:
+        """Memory lookup. Returns a copy of the stored track, safe for the caller to modify."""
+        entry = self._entry(video_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return replace(entry.track)
+
+    def formats(self, video_id: str) -> List[dict]:
+        entry = self._entry(video_id)
+        return entry.formats if entry else []
+
+    # --- Persistent tier ---
+    async def load(self, video_id: str) -> Optional[Track]:
+        """Memory, then database lookup, promoting a database hit into memory."""
+        entry = self._entry(video_id)
+        if entry is not None:
+            self.hits += 1
+            return replace(entry.track)
+        if re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id or "") and self._db_usable():
+            try:
+                doc = await asyncio.wait_for(
+                    self._collection().find_one(
+                        {"_id": video_id, "expires": {"$gt": datetime.now(timezone.utc)}}
+                    ),
+                    timeout=DB_TIMEOUT,
+                )
+            except Exception as e:
+                self._db_failed("lookup", e)
+                doc = None
+            if doc:
+                try:
+                    track = Track(**{k: v for k, v in doc["track"].items() if k in _TRACK_FIELDS})
+                except (KeyError, TypeError):
+                    track = None
+                if track:
+                    self.db_hits += 1
+                    self._remember(video_id, track, doc.get("formats") or [])
+                    return replace(track)
+        self.misses += 1
+        return None
+
+    async def fill(self, track) -> bool:
+        """Fill a queued track's missing thumbnail, duration, channel and views in
+        place from the store, without extracting. Returns True if it is complete."""
+        if not isinstance(track, Track):
+            return False  # Telegram files carry no YouTube metadata
+        if is_complete(track) or not re.fullmatch(r"[A-Za-z0-9_-]{11}", track.id or ""):
+            return is_complete(track)
+        known = await self.load(track.id)
+        if not known:
+            return False
+        if known.thumbnail and not track.thumbnail:
+            track.thumbnail = known.thumbnail
+        if known.duration_sec and not track.duration_sec:
+            track.duration_sec = known.duration_sec
+            track.duration = known.duration
+        if not track.channel_name:
+            track.channel_name = known.channel_name
+        if not track.view_count:
+            track.view_count = known.view_count
+        track.is_live = track.is_live or known.is_live
+        return is_complete(track)
+
+    def put(self, track: Optional[Track], formats: Optional[List[dict]] = None) -> None:
+        """Store what is known about a track, in memory now and in the database in
+        the background."""
+        if not track or not re.fullmatch(r"[A-Za-z0-9_-]{11}", track.id or ""):
+            return
+        track = replace(track, **_REQUEST_FIELDS)
+        previous = self._entries.get(track.id)
+        if previous is not None:
+            track = _merge(previous.track, track)
+            formats = formats or previous.formats
+            if previous.track == track and previous.formats == formats:
+                # Nothing new (e.g. the same inline result again): just refresh
+                previous.expires = time.monotonic() + self.ttl
+                self._entries.move_to_end(track.id)
+                return
+        formats = formats or []
+        self._remember(track.id, track, formats)
+        if not self._db_usable():
+            return
+        task = asyncio.create_task(self._store(track, formats))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def put_info(self, data: dict) -> Optional[Track]:
+        """Store the track (and formats) described by a yt-dlp info dict or flat entry."""
+        track = track_from_info(data)
+        self.put(track, _formats_from_info(data))
+        return track
+
+    async def _store(self, track: Track, formats: List[dict]) -> None:
+        doc = {
+            "track": asdict(track),
+            "formats": formats,
+            "expires": datetime.now(timezone.utc) + timedelta(seconds=self.db_ttl),
+        }
+        try:
+            await asyncio.wait_for(
+                self._collection().update_one({"_id": track.id}, {"$set": doc}, upsert=True),
+                timeout=DB_TIMEOUT * 5,
+            )
+        except Exception as e:
+            self._db_failed("write", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            "tracks": len(self._entries),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+            "db_errors": self.db_errors,
+            "db_enabled": self._db_usable(),
+        }
@@ -0,0 +1,177 @@
+# ==============================================================================
+# playlist.py - Paged YouTube Playlists
+# ==============================================================================
+# This file lists YouTube playlists a page at a time instead of extracting
+# the whole playlist up front, so a 5000-track playlist starts playing as
+# fast as a 20-track one and only the part being played is held in memory.
+# Features:
+# - Continuation state cached per playlist: title, entries listed so far and
+#   whether the end was reached
+# - Batches are sliced from the cached listing; yt-dlp only runs when a batch
+#   goes past it, and then lists one whole YouTube page (100 videos) at once
+# - The following page is listed in the background once a batch comes close
+#   to the end of what is cached
+# - Chats playing the same playlist share one listing and one extraction
+# ==============================================================================
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+from HasiiMusic import config, logger
+from HasiiMusic.helpers import SingleFlight, Track, utils
+
+PAGE_SIZE = 100  # videos YouTube returns per playlist page
+CACHE_SIZE = 64  # playlists whose listing is kept
+_LIST_ID = re.compile(r"[?&]list=([A-Za-z0-9_-]+)")
+# Only what a Track is built from, so a cached listing stays small
+_FIELDS = ("id", "title", "duration", "uploader", "channel", "url", "thumbnails", "is_live")
+
+
+@dataclass
+class PlaylistState:
+    title: str = ""
+    entries: List[dict] = field(default_factory=list)
+    exhausted: bool = False
+    expires: float = 0.0
+
+
+class PlaylistPager:
+    def __init__(self, cookies_manager, pool):
+        self._cookies = cookies_manager
+        self._pool = pool
+        self.ttl = getattr(config, "PLAYLIST_STATE_TTL_MINUTES", 60) * 60
+        self._states: OrderedDict[str, PlaylistState] = OrderedDict()
+        self._flights = SingleFlight()
+        self._tasks: Set[asyncio.Task] = set()
+        self.pages = 0
+        self.cached_batches = 0
+        self.read_ahead = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        match = _LIST_ID.search(url)
+        return match.group(1) if match else url
+
+    def _state(self, key: str) -> PlaylistState:
+        state = self._states.get(key)
+        if state is None or time.monotonic() >= state.expires:
+            state = self._states[key] = PlaylistState()
+        state.expires = time.monotonic() + self.ttl
+        self._states.move_to_end(key)
+        while len(self._states) > CACHE_SIZE:
+            self._states.popitem(last=False)
+        return state
+
+    # --- Paging ---
+    async def page(self, url: str, user: str, offset: int, limit: int) -> List[Track]:
+        """Tracks offset+1 .. offset+limit of the playlist, listing further pages
+        only when the cached listing doesn't reach that far."""
+        key = self.key(url)
+        state = self._state(key)
+        end = offset + limit
+        if len(state.entries) >= end or state.exhausted:
+            self.cached_batches += 1
+        try:
+            while len(state.entries) < end and not state.exhausted:
+                listed = len(state.entries)
+                await self._flights.do((key, listed), lambda: self._list(url, state, listed))
+                if len(state.entries) == listed:
+                    break
+        except Exception as e:
+            logger.warning(f"⚠️ YouTube playlist extraction failed for '{url}' at offset {offset}: {e}")
+            return []
+
+        # Getting close to the end of the listing: fetch the next page while this batch plays
+        if not state.exhausted and len(state.entries) - end < limit:
+            self._read_ahead(url, key, state)
+
+        return [
+            track
+            for index, entry in enumerate(state.entries[offset:end], start=offset + 1)
+            if (track := self._track(entry, user, url, state.title, index))
+        ]
+
+    def _read_ahead(self, url: str, key: str, state: PlaylistState) -> None:
+        listed = len(state.entries)
+        if (key, listed) in self._flights.keys():
+            return
+        self.read_ahead += 1
+
+        async def _run() -> None:
+            try:
+                await self._flights.do((key, listed), lambda: self._list(url, state, listed))
+            except Exception as e:
+                logger.debug(f"Could not list ahead in playlist {key}: {e}")
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _list(self, url: str, state: PlaylistState, listed: int) -> None:
+        """List the YouTube page holding entry listed+1 and append it to the state."""
+        if len(state.entries) != listed or state.exhausted:
+            return
+        # Round up to whole pages: a partial page costs YouTube the same request
+        stop = (listed // PAGE_SIZE + 1) * PAGE_SIZE
+        opts = {
+            "quiet": True,
+            "extract_flat": "in_playlist",
+            "playlist_items": f"{listed + 1}:{stop}",
+            "cookiefile": self._cookies.get_cookies() if self._cookies.checked else None,
+        }
+        plist = await self._pool.extract(url, opts)
+        self.pages += 1
+        entries = [
+            {k: entry[k] for k in _FIELDS if k in entry}
+            for entry in (plist or {}).get("entries") or []
+            if entry
+        ]
+        if len(state.entries) != listed:
+            return
+        state.title = state.title or (plist or {}).get("title") or ""
+        state.entries.extend(entries)
+        total = (plist or {}).get("playlist_count")
+        if len(entries) < stop - listed or (total and len(state.entries) >= total):
+            state.exhausted = True
+
+    @staticmethod
+    def _track(data: dict, user: str, url: str, title: str, index: int) -> Optional[Track]:
+        try:
+            duration_sec = data.get("duration")
+            is_live = data.get("is_live", False)
+            if duration_sec is None and is_live:
+                duration = "LIVE"
+                duration_sec = 0
+            else:
+                duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
+
+            return Track(
+                id=data.get("id", ""),
+                channel_name=data.get("uploader") or data.get("channel", ""),
+                duration=duration,
+                duration_sec=int(duration_sec) if duration_sec else 0,
+                title=((data.get("title") or "Unknown")[:25]),
+                thumbnail=data.get("thumbnails", [{}])[-1].get("url", "").split("?")[0] if data.get("thumbnails") else "",
+                url=data.get("url") or f"https://youtube.com/watch?v={data.get('id')}",
+                user=user,
+                view_count="",
+                is_live=bool(is_live),
+                playlist_name=title or "YouTube Playlist",
+                playlist_url=url,
+                playlist_type="youtube",
+                playlist_index=index,
+            )
+        except Exception:
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "playlists": len(self._states),
+            "entries": sum(len(s.entries) for s in self._states.values()),
+            "pages": self.pages,
+            "cached_batches": self.cached_batches,
+            "read_ahead": self.read_ahead,
+        }
@@ -0,0 +1,271 @@
+# ==============================================================================
+# pool.py - yt-dlp Extractor Pool
+# ==============================================================================
+# This file runs yt-dlp extractions and downloads in long-lived worker
+# processes instead of a fresh YoutubeDL per call inside asyncio.to_thread.
+# Features:
+# - Warm YoutubeDL instances (no extractor init per call, no GIL contention)
+# - Async RPC API for search, metadata and downloads
+# - Recycles each worker after a configurable number of jobs
+# - Kills and replaces workers that go silent past the job timeout; downloads
+#   send progress heartbeats, so a long track is never mistaken for a hang
+# - Queue depth and job metrics
+# - Reports the outcome of every cookie-authenticated call
+# - Stops downloads whose caller was cancelled, keeping their partial files
+# - Falls back to threads when the pool is disabled (YTDLP_WORKERS=0)
+# ==============================================================================
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import yt_dlp
+from HasiiMusic import logger
+
+from .worker import extract as extract_in_thread
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+READ_LIMIT = 64 * 1024 * 1024  # sanitized info dicts with all formats can be large
+EXTRACTOR_ERRORS = {"ExtractorError", "GeoRestrictedError", "UnsupportedError", "RegexNotFoundError"}
+
+
+class _Worker:
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.jobs = 0
+        self.dead = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.dead and self.proc.returncode is None
+
+    def kill(self) -> None:
+        if self.alive:
+            self.dead = True
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+
+
+class ExtractorPool:
+    def __init__(
+        self,
+        size: int = 0,
+        max_jobs: int = 200,
+        timeout: int = 300,
+        on_result: Optional[Callable[[Optional[str], bool, str], None]] = None,
+    ):
+        self.size = max(0, size)
+        # Called as on_result(cookiefile, ok, error_message) after each call
+        self.on_result = on_result
+        self.max_jobs = max(1, max_jobs)
+        self.timeout = timeout
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_Worker] = []
+        self._ids = itertools.count(1)
+        self._spawn_lock: Optional[asyncio.Lock] = None
+        # {url: future} for cancelled downloads that are still letting go of their files
+        self._draining: Dict[str, asyncio.Future] = {}
+        # Metrics
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.recycled = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def extract(self, url: str, opts: dict, download: bool = False) -> Optional[dict]:
+        """Run extract_info(url) with the given yt-dlp options and return the sanitized info dict.
+
+        Raises yt-dlp's DownloadError/ExtractorError like a direct YoutubeDL call would.
+        If the caller is cancelled during a download, the download is stopped and its
+        ".part" files are left for the next download of the same URL to resume.
+        """
+        draining = self._draining.get(url) if download else None
+        if draining:
+            # Let the cancelled download stop writing before we resume its files
+            await asyncio.wait({draining})
+
+        if not self.enabled:
+            cancel = threading.Event()
+            job = asyncio.ensure_future(
+                asyncio.to_thread(extract_in_thread, opts, url, download, cancel)
+            )
+            try:
+                info = await asyncio.shield(job)
+            except asyncio.CancelledError:
+                cancel.set()
+                if download:
+                    self._drain(url, job)
+                raise
+            except Exception as e:
+                self._report(opts, False, str(e))
+                raise
+            self._report(opts, True)
+            return info
+
+        await self._ensure_started()
+        self.waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self.waiting -= 1
+
+        job = {"id": next(self._ids), "url": url, "opts": opts, "download": download}
+        self.running += 1
+        started = time.monotonic()
+        call = asyncio.create_task(self._roundtrip(worker, job))
+        # The caller may give up (cancel/timeout), but the worker is still busy until
+        # it answers, so the worker only returns to the pool once the call finishes.
+        call.add_done_callback(lambda t, w=worker, s=started: self._finish(w, t, s))
+        try:
+            reply = await asyncio.shield(call)
+        except asyncio.CancelledError:
+            # Killing the worker is the only way to stop yt-dlp mid-download;
+            # _finish() replaces it. Metadata calls are left to finish.
+            if download and call.cancel():
+                self._drain(url, asyncio.ensure_future(worker.proc.wait()))
+            raise
+
+        if reply.get("ok"):
+            self._report(opts, True)
+            return reply.get("info")
+        self._report(opts, False, reply.get("message", ""))
+        raise self._rebuild_error(reply.get("error", ""), reply.get("message", ""))
+
+    def _drain(self, url: str, future: asyncio.Future) -> None:
+        self._draining[url] = future
+
+        def _done(f: asyncio.Future) -> None:
+            if not f.cancelled():
+                f.exception()  # retrieved so it isn't logged as unhandled
+            if self._draining.get(url) is f:
+                del self._draining[url]
+
+        future.add_done_callback(_done)
+
+    def _report(self, opts: dict, ok: bool, message: str = "") -> None:
+        cookie = opts.get("cookiefile")
+        if cookie and self.on_result:
+            self.on_result(cookie, ok, message)
+
+    async def _roundtrip(self, worker: _Worker, job: dict) -> dict:
+        try:
+            worker.proc.stdin.write((json.dumps(job, default=str) + "\n").encode())
+            await worker.proc.stdin.drain()
+            while True:
+                # The timeout covers silence, not the whole job: downloads report progress
+                line = await asyncio.wait_for(worker.proc.stdout.readline(), timeout=self.timeout)
+                reply = json.loads(line) if line else None
+                if not reply or not reply.get("progress"):
+                    break
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ yt-dlp worker {worker.proc.pid} timed out, replacing it")
+            worker.kill()
+            return {"ok": False, "error": "DownloadError", "message": "yt-dlp worker timed out"}
+        except (BrokenPipeError, ConnectionResetError) as e:
+            worker.kill()
+            return {"ok": False, "error": "DownloadError", "message": f"yt-dlp worker died: {e}"}
+        if not line:
+            worker.kill()
+            return {"ok": False, "error": "DownloadError", "message": "yt-dlp worker exited"}
+        return reply
+
+    def _finish(self, worker: _Worker, call: asyncio.Task, started: float) -> None:
+        self.running -= 1
+        self.busy_seconds += time.monotonic() - started
+        broken = call.cancelled() or call.exception() is not None
+        if broken:
+            # We no longer know where the worker is in the protocol
+            worker.kill()
+        if not broken and call.result().get("ok"):
+            self.completed += 1
+        else:
+            self.failed += 1
+        worker.jobs += 1
+        if self._idle is None:
+            # Pool was closed while this job ran
+            worker.kill()
+        elif not worker.alive or worker.jobs >= self.max_jobs:
+            asyncio.create_task(self._replace(worker))
+        else:
+            self._idle.put_nowait(worker)
+
+    @staticmethod
+    def _rebuild_error(name: str, message: str) -> Exception:
+        if name in EXTRACTOR_ERRORS:
+            return yt_dlp.utils.ExtractorError(message, expected=True)
+        return yt_dlp.utils.DownloadError(message)
+
+    # --- Lifecycle ---
+    async def _spawn(self) -> _Worker:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=READ_LIMIT,
+        )
+        worker = _Worker(proc)
+        self._workers.append(worker)
+        return worker
+
+    async def _ensure_started(self) -> None:
+        if self._idle is not None:
+            return
+        if self._spawn_lock is None:
+            self._spawn_lock = asyncio.Lock()
+        async with self._spawn_lock:
+            if self._idle is not None:
+                return
+            idle: asyncio.Queue = asyncio.Queue()
+            for _ in range(self.size):
+                idle.put_nowait(await self._spawn())
+            self._idle = idle
+            logger.info(f"⚙️ Started {self.size} yt-dlp worker process(es).")
+
+    async def _replace(self, worker: _Worker) -> None:
+        if worker.alive:
+            self.recycled += 1
+            try:
+                worker.proc.stdin.close()
+                await asyncio.wait_for(worker.proc.wait(), timeout=5)
+            except Exception:
+                worker.kill()
+        if worker in self._workers:
+            self._workers.remove(worker)
+        try:
+            self._idle.put_nowait(await self._spawn())
+        except Exception as e:
+            logger.error(f"❌ Could not respawn yt-dlp worker: {e}")
+
+    async def close(self) -> None:
+        for worker in list(self._workers):
+            try:
+                worker.proc.stdin.close()
+            except Exception:
+                pass
+            worker.kill()
+        self._workers.clear()
+        self._idle = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers) if self.enabled else 0,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recycled": self.recycled,
+            "avg_job_seconds": round(self.busy_seconds / max(1, self.completed + self.failed), 3),
+        }
@@ -0,0 +1,217 @@
+# ==============================================================================
+# ranged.py - Multi-Connection Ranged Fetcher
+# ==============================================================================
+# This file downloads a single HTTP media URL over several parallel range
+# requests, used for large /vplay video formats.
+# Features:
+# - Splits the file into fixed-size chunks fetched by N connections
+# - Writes straight into a preallocated file at each chunk's offset
+# - Records per-chunk progress in a ".chunks" sidecar so interrupted
+#   downloads resume mid-chunk; finished parts are reused as they are
+# - Disk writes and progress saves run off the event loop
+# - Optional per-download bandwidth cap shared by all connections
+# ==============================================================================
+
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional, Set
+
+import aiohttp
+from HasiiMusic import logger
+
+SIDECAR_EXT = ".chunks"
+PART_EXT = ".ranged"  # per-format parts, kept apart from yt-dlp's own intermediates
+READ_SIZE = 256 * 1024
+SAVE_INTERVAL = 2.0  # seconds between progress saves while chunks complete
+
+
+def sidecar(path: str) -> str:
+    return path + SIDECAR_EXT
+
+
+def is_complete(path: str, size: int) -> bool:
+    """A preallocated part is complete once it has its full size and its sidecar
+    is gone (the sidecar is written before the first byte and removed last)."""
+    try:
+        return os.path.getsize(path) == size and not os.path.exists(sidecar(path))
+    except OSError:
+        return False
+
+
+class _RateLimiter:
+    """Token bucket shared by the connections of one download."""
+
+    def __init__(self, bytes_per_sec: int):
+        self.rate = bytes_per_sec
+        self._allowance = float(bytes_per_sec)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, n: int) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= n
+            if self._allowance < 0:
+                await asyncio.sleep(-self._allowance / self.rate)
+
+
+class _Plan:
+    def __init__(self, size: int, chunk_size: int, progress: List[int]):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.progress = progress  # bytes already written for each chunk
+        self._saved_at = 0.0
+
+    @classmethod
+    def load_or_new(cls, path: str, size: int, chunk_size: int) -> "_Plan":
+        try:
+            with open(sidecar(path)) as f:
+                state = json.load(f)
+            if state["size"] == size and os.path.getsize(path) == size:
+                return cls(size, state["chunk_size"], state["progress"])
+        except (OSError, ValueError, KeyError):
+            pass
+        count = (size + chunk_size - 1) // chunk_size
+        return cls(size, chunk_size, [0] * count)
+
+    def bounds(self, index: int) -> tuple[int, int]:
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size)
+
+    def pending(self) -> List[int]:
+        return [
+            i for i, done in enumerate(self.progress)
+            if done < self.bounds(i)[1] - self.bounds(i)[0]
+        ]
+
+    async def save(self, path: str) -> None:
+        # Snapshot on the loop (other connections keep updating progress), write in a thread
+        state = json.dumps({"size": self.size, "chunk_size": self.chunk_size, "progress": self.progress})
+        self._saved_at = time.monotonic()
+        await asyncio.to_thread(_write, sidecar(path), state)
+
+    async def checkpoint(self, path: str) -> None:
+        """save(), at most every SAVE_INTERVAL seconds."""
+        if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            await self.save(path)
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class RangedFetcher:
+    def __init__(self, connections: int = 4, chunk_size: int = 4 * 1024 * 1024, rate_limit: int = 0):
+        self.connections = max(1, connections)
+        self.chunk_size = max(READ_SIZE, chunk_size)
+        self.rate_limit = rate_limit  # bytes/sec per download, 0 = unlimited
+
+    @staticmethod
+    def _preallocate(path: str, size: int) -> None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+                if hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(fd, 0, size)
+                    except OSError:
+                        pass  # sparse file is fine on filesystems without fallocate
+        finally:
+            os.close(fd)
+
+    async def fetch(self, url: str, dest: str, size: int, headers: Optional[dict] = None) -> bool:
+        """Download url (size bytes) into dest. Returns True once every chunk is on disk."""
+        if await asyncio.to_thread(is_complete, dest, size):
+            return True
+        plan = await asyncio.to_thread(_Plan.load_or_new, dest, size, self.chunk_size)
+        if not any(plan.progress):
+            await asyncio.to_thread(self._preallocate, dest, size)
+        await plan.save(dest)
+
+        todo: asyncio.Queue = asyncio.Queue()
+        for index in plan.pending():
+            todo.put_nowait(index)
+        limiter = _RateLimiter(self.rate_limit)
+        fd = os.open(dest, os.O_RDWR)
+        writes: Set[asyncio.Future] = set()  # pwrites still running in a thread
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30)
+        try:
+            async with aiohttp.ClientSession(headers=headers or {}, timeout=timeout) as session:
+                workers = [
+                    asyncio.create_task(self._worker(session, url, dest, fd, writes, plan, todo, limiter))
+                    for _ in range(min(self.connections, todo.qsize()) or 1)
+                ]
+                try:
+                    await asyncio.gather(*workers)
+                except BaseException:
+                    for w in workers:
+                        w.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                    raise
+        except Exception as e:
+            logger.warning(f"⚠️ Ranged download of {os.path.basename(dest)} interrupted: {e}")
+            return False
+        finally:
+            # Cancelled workers may leave a pwrite running in its thread. Close the fd
+            # only after those are done, or the number could be reused by another
+            # file or socket and receive the rest of the video.
+            drained = asyncio.gather(*writes, return_exceptions=True)
+            drained.add_done_callback(lambda _: os.close(fd))
+            await asyncio.shield(drained)
+            await plan.save(dest)
+
+        if plan.pending():
+            return False
+        os.remove(sidecar(dest))
+        return True
+
+    async def _worker(self, session, url, dest, fd, writes, plan: _Plan, todo: asyncio.Queue, limiter) -> None:
+        while True:
+            try:
+                index = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            for attempt in range(3):
+                try:
+                    await self._fetch_chunk(session, url, fd, writes, plan, index, limiter)
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == 2:
+                        raise
+                    await asyncio.sleep(1 + attempt)
+            await plan.checkpoint(dest)
+
+    @staticmethod
+    async def _fetch_chunk(session, url, fd, writes: Set[asyncio.Future], plan: _Plan, index: int, limiter) -> None:
+        start, end = plan.bounds(index)
+        offset = start + plan.progress[index]
+        if offset >= end:
+            return
+        async with session.get(url, headers={"Range": f"bytes={offset}-{end - 1}"}) as resp:
+            if resp.status != 206:
+                raise aiohttp.ClientResponseError(
+                    resp.request_info, resp.history, status=resp.status,
+                    message="server ignored the range request",
+                )
+            async for data in resp.content.iter_chunked(READ_SIZE):
+                data = data[: end - offset]
+                if not data:
+                    break
+                await limiter.consume(len(data))
+                write = asyncio.ensure_future(asyncio.to_thread(os.pwrite, fd, data, offset))
+                writes.add(write)
+                write.add_done_callback(writes.discard)
+                # Shielded: a cancel stops this worker, not the write fetch() waits for
+                await asyncio.shield(write)
+                offset += len(data)
+                plan.progress[index] = offset - start
+        if offset < end:
+            raise aiohttp.ClientPayloadError(f"chunk {index} ended early at {offset}/{end}")
@@ -0,0 +1,134 @@
+# ==============================================================================
+# scheduler.py - Priority Download Scheduler
+# ==============================================================================
+# This file decides which pending download gets the next free download slot.
+# Features:
+# - Explicit priority classes (now playing > next up > preload > speculative)
+# - Reserves slots so background work can never starve on-demand downloads
+# - Promotes a waiting background download when a user needs that track now
+# ==============================================================================
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    NOW_PLAYING = 0  # A chat is waiting on this track right now
+    NEXT_UP = 1      # Next track in the queue, about to play
+    PRELOAD = 2      # Upcoming tracks warmed in the background
+    SPECULATIVE = 3  # Might never be played (e.g. search-time warm-up)
+
+    @property
+    def background(self) -> bool:
+        return self >= Priority.PRELOAD
+
+
+class _Ticket:
+    __slots__ = ("key", "priority", "future", "state", "background", "queued_at")
+
+    def __init__(self, key: Optional[str], priority: Priority, future: asyncio.Future):
+        self.key = key
+        self.priority = priority
+        self.future = future
+        self.state = "waiting"  # waiting -> running -> done, or waiting -> cancelled
+        self.background = False
+        self.queued_at = time.monotonic()
+
+
+class DownloadScheduler:
+    def __init__(self, slots: int = 5, background_slots: Optional[int] = None):
+        self.slots = max(1, slots)
+        # Background classes may only use this many slots, the rest are
+        # kept free for now-playing/next-up work
+        if background_slots is None or background_slots <= 0:
+            background_slots = self.slots - 1
+        self.background_slots = max(1, min(background_slots, self.slots))
+        self._active = 0
+        self._active_background = 0
+        self._heap: List[Tuple[int, int, _Ticket]] = []
+        self._waiting: Dict[str, _Ticket] = {}
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, key: Optional[str] = None) -> AsyncIterator[float]:
+        """Hold a download slot for the duration of the block. Yields the queue wait in seconds."""
+        ticket = _Ticket(key, Priority(priority), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (ticket.priority, next(self._seq), ticket))
+        if key:
+            self._waiting[key] = ticket
+        self._grant()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.state == "running":
+                self._release(ticket)
+            else:
+                ticket.state = "cancelled"
+                self._forget(ticket)
+            raise
+
+        try:
+            yield time.monotonic() - ticket.queued_at
+        finally:
+            self._release(ticket)
+
+    def promote(self, key: str, priority: Priority) -> bool:
+        """Raise the priority of a waiting download. Returns True if it was promoted."""
+        ticket = self._waiting.get(key)
+        if not ticket or ticket.state != "waiting" or priority >= ticket.priority:
+            return False
+        ticket.priority = Priority(priority)
+        # The old heap entry goes stale; _grant skips entries whose priority no longer matches
+        heapq.heappush(self._heap, (ticket.priority, next(self._seq), ticket))
+        self._grant()
+        return True
+
+    def _forget(self, ticket: _Ticket) -> None:
+        if ticket.key and self._waiting.get(ticket.key) is ticket:
+            del self._waiting[ticket.key]
+
+    def _grant(self) -> None:
+        while self._heap and self._active < self.slots:
+            priority, _, ticket = self._heap[0]
+            if ticket.state != "waiting" or priority != ticket.priority:
+                heapq.heappop(self._heap)
+                continue
+            background = ticket.priority.background
+            if background and self._active_background >= self.background_slots:
+                # Heap head is background, so nothing more urgent is waiting
+                return
+            heapq.heappop(self._heap)
+            ticket.state = "running"
+            ticket.background = background
+            self._active += 1
+            if background:
+                self._active_background += 1
+            self._forget(ticket)
+            ticket.future.set_result(None)
+
+    def _release(self, ticket: _Ticket) -> None:
+        if ticket.state != "running":
+            return
+        ticket.state = "done"
+        self._active -= 1
+        if ticket.background:
+            self._active_background -= 1
+        self._grant()
+
+    def stats(self) -> dict:
+        waiting = {p.name.lower(): 0 for p in Priority}
+        for priority, _, ticket in self._heap:
+            if ticket.state == "waiting" and priority == ticket.priority:
+                waiting[ticket.priority.name.lower()] += 1
+        return {
+            "slots": self.slots,
+            "active": self._active,
+            "active_background": self._active_background,
+            "waiting": waiting,
+        }
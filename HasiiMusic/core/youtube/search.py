@@ -3,21 +3,35 @@
 # ==============================================================================
 # This file handles querying metadata from YouTube.
 # Features:
-# - Extracts single tracks and playlists via yt-dlp
-# - Maintains a short-lived search cache for rapid lookups
+# - Extracts single tracks via the yt-dlp extractor pool
+# - Caches search results in memory and in MongoDB across restarts
+# - Coalesces identical concurrent searches into one extraction
+# - Normalises queries so variants of the same request share one result
+# - Answers links to already-known videos from the track metadata store
+# - Fails at once for links to videos YouTube recently refused to serve
+# - Hedges slow extractions with a second attempt on another cookie/worker
 # - Optimizes searches for high-quality audio
 # ==============================================================================
 
-import asyncio
 from dataclasses import replace
 from HasiiMusic import logger
-from HasiiMusic.helpers import Track, utils
-import yt_dlp
+from typing import Optional
+from HasiiMusic.helpers import SingleFlight, Track, normalize_query
+
+from .hedge import Hedger
+from .metadata import is_complete
+from .search_cache import SearchCache
+
 
 class Searcher:
-    def __init__(self, cookies_manager):
+    def __init__(self, cookies_manager, pool, tracks, unplayable):
         self._cookies = cookies_manager
-        self.search_cache = {}  # {"query_video": (result, timestamp)}
+        self._pool = pool
+        self._tracks = tracks
+        self._unplayable = unplayable
+        self.search_cache = SearchCache()
+        self.hedger = Hedger()
+        self._flights = SingleFlight()
 
     def valid(self, url: str) -> bool:
         # Re-using the regex from utils - or we can just assume caller knows
@@ -26,154 +40,97 @@ class Searcher:
         return YouTubeUtils().valid(url)
 
     async def search(self, query: str, m_id: int, music: bool = False) -> Track | None:
-        cache_key = query
-        current_time = asyncio.get_running_loop().time()
+        # "Shape of You", "shape of you (lyrics)" and a music search for it
+        # (which appends "Official Audio") all share one cache entry
+        cache_key = normalize_query(query)
+        cached = self.search_cache.get(cache_key)
+        if not cached and cache_key.startswith("yt:"):
+            # A link to a video we've already described (e.g. an inline result)
+            known = self._tracks.get(cache_key[3:])
+            cached = known if is_complete(known) else None
+        if cached:
+            cached.message_id = m_id
+            return cached
+        if cache_key.startswith("yt:") and self._unplayable.get(cache_key[3:]):
+            return None
 
-        if cache_key in self.search_cache:
-            cached_result, cache_timestamp = self.search_cache[cache_key]
-            if current_time - cache_timestamp < 600:  # 10 minutes
-                fresh = replace(cached_result)
-                fresh.message_id = m_id
-                fresh.file_path = None
-                fresh.user = None
-                fresh.time = 0
-                fresh.video = False
-                return fresh
+        # Twenty chats searching the same song share one yt-dlp extraction
+        track = await self._flights.do(
+            cache_key, lambda: self._search(query, cache_key, music)
+        )
+        if not track:
+            return None
+        fresh = replace(track)
+        fresh.message_id = m_id
+        return fresh
+
+    async def cached(self, key: str) -> Optional[Track]:
+        """Look a canonical key up in both cache tiers without searching."""
+        return self.search_cache.get(key) or await self.search_cache.load(key)
+
+    def remember(self, key: str, track: Track) -> None:
+        """Cache a track resolved elsewhere (e.g. from a Spotify link) under key."""
+        self.search_cache.put(key, track)
+
+    async def _extract(self, url: str, opts: dict) -> Optional[dict]:
+        """pool.extract(), hedged: if it runs slow, a second attempt goes out on
+        another cookie (and, with worker processes, another worker)."""
+        used = []
+
+        def attempt():
+            cookie = (
+                self._cookies.get_cookies(exclude=used[-1] if used else None)
+                if self._cookies.checked else None
+            )
+            used.append(cookie)
+            return self._pool.extract(url, {**opts, "cookiefile": cookie})
+
+        return await self.hedger.run(attempt)
+
+    async def _search(self, query: str, cache_key: str, music: bool) -> Track | None:
+        cached = await self.search_cache.load(cache_key)
+        if cached:
+            return cached
+        if cache_key.startswith("yt:"):
+            # Described before, possibly before a restart
+            known = await self._tracks.load(cache_key[3:])
+            if is_complete(known):
+                return known
 
         if music and not query.lower().endswith("audio"):
             query = f"{query} Official Audio"
             
         try:
             if self.valid(query):
-                def _extract():
-                    cookie = self._cookies.get_cookies() if self._cookies.checked else None
-                    ydl_opts = {
-                        "quiet": True,
-                        "noplaylist": True,
-                        "extract_flat": "in_playlist",
-                        "cookiefile": cookie
-                    }
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        return ydl.extract_info(query, download=False)
-
-                data = await asyncio.to_thread(_extract)
+                ydl_opts = {
+                    "quiet": True,
+                    "noplaylist": True,
+                    "extract_flat": "in_playlist",
+                }
+                data = await self._extract(query, ydl_opts)
                 if not data:
                     return None
-
-                duration_sec = data.get("duration")
-                is_live = data.get("is_live", False)
-                if duration_sec is None and is_live:
-                    duration = "LIVE"
-                    duration_sec = 0
-                else:
-                    duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
-
-                track = Track(
-                    id=data.get("id"),
-                    channel_name=data.get("uploader") or data.get("channel", ""),
-                    duration=duration,
-                    duration_sec=int(duration_sec) if duration_sec else 0,
-                    message_id=m_id,
-                    title=(data.get("title") or "")[:25],
-                    thumbnail=data.get("thumbnail") or "",
-                    url=data.get("webpage_url") or query,
-                    view_count=str(data.get("view_count", "")),
-                    is_live=is_live,
-                )
             else:
-                def _extract_search():
-                    cookie = self._cookies.get_cookies() if self._cookies.checked else None
-                    ydl_opts = {
-                        "quiet": True,
-                        "extract_flat": True,
-                        "cookiefile": cookie
-                    }
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        return ydl.extract_info(f"ytsearch1:{query}", download=False)
-                        
-                results = await asyncio.to_thread(_extract_search)
+                ydl_opts = {
+                    "quiet": True,
+                    "extract_flat": True,
+                }
+                results = await self._extract(f"ytsearch1:{query}", ydl_opts)
                 
                 if not results or "entries" not in results or not results["entries"]:
                     return None
                     
                 data = results["entries"][0]
-                duration_sec = data.get("duration")
-                is_live = data.get("is_live", False)
-                if duration_sec is None and is_live:
-                    duration = "LIVE"
-                    duration_sec = 0
-                else:
-                    duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
-
-                track = Track(
-                    id=data.get("id"),
-                    channel_name=data.get("uploader") or data.get("channel", ""),
-                    duration=duration,
-                    duration_sec=int(duration_sec) if duration_sec else 0,
-                    message_id=m_id,
-                    title=(data.get("title") or "")[:25],
-                    thumbnail=data.get("thumbnails", [{}])[-1].get("url", "").split("?")[0] if data.get("thumbnails") else "",
-                    url=data.get("url") or data.get("webpage_url") or f"https://youtube.com/watch?v={data.get('id')}",
-                    view_count=str(data.get("view_count", "")),
-                    is_live=is_live,
-                )
-
-            self.search_cache[cache_key] = (track, current_time)
-            if len(self.search_cache) > 100:
-                oldest_key = min(self.search_cache.keys(),
-                                 key=lambda k: self.search_cache[k][1])
-                del self.search_cache[oldest_key]
 
+            # Also keeps the formats of a full extraction for later size estimates
+            track = self._tracks.put_info(data)
+            if not track:
+                return None
+            self.search_cache.put(cache_key, track)
             return replace(track)
             
         except Exception as e:
+            if cache_key.startswith("yt:"):
+                self._unplayable.mark(cache_key[3:], e)
             logger.warning(f"⚠️ YouTube search failed for '{query}': {e}")
             return None
-
-    async def playlist(self, limit: int, user: str, url: str) -> list[Track]:
-        try:
-            def _extract_playlist():
-                cookie = self._cookies.get_cookies() if self._cookies.checked else None
-                ydl_opts = {
-                    "quiet": True,
-                    "extract_flat": "in_playlist",
-                    "cookiefile": cookie
-                }
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(url, download=False)
-                    
-            plist = await asyncio.to_thread(_extract_playlist)
-            tracks = []
-
-            if not plist or "entries" not in plist or not plist["entries"]:
-                return []
-
-            for data in plist["entries"][:limit]:
-                try:
-                    duration_sec = data.get("duration")
-                    is_live = data.get("is_live", False)
-                    if duration_sec is None and is_live:
-                        duration = "LIVE"
-                        duration_sec = 0
-                    else:
-                        duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
-
-                    track = Track(
-                        id=data.get("id", ""),
-                        channel_name=data.get("uploader") or data.get("channel", ""),
-                        duration=duration,
-                        duration_sec=int(duration_sec) if duration_sec else 0,
-                        title=(data.get("title", "Unknown")[:25]),
-                        thumbnail=data.get("thumbnails", [{}])[-1].get("url", "").split("?")[0] if data.get("thumbnails") else "",
-                        url=data.get("url") or data.get("webpage_url") or f"https://youtube.com/watch?v={data.get('id')}",
-                        user=user,
-                        view_count="",
-                    )
-                    tracks.append(track)
-                except Exception:
-                    continue
-
-            return tracks
-        except Exception as e:
-            logger.warning(f"⚠️ YouTube playlist extraction failed for '{url}': {e}")
-            return []
@@ -0,0 +1,134 @@
+# ==============================================================================
+# search_cache.py - Two-Tier Search Cache
+# ==============================================================================
+# This file caches search results so repeat searches skip yt-dlp entirely.
+# Features:
+# - O(1) LRU memory tier with a configurable size and TTL
+# - Persistent MongoDB tier that survives restarts (expired by a TTL index)
+# - Persistent writes happen in the background and never delay a search
+# - Backs off from the database for a while when it is slow or unreachable
+# - Hit/miss counters per tier
+# ==============================================================================
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set, Tuple
+from HasiiMusic import config, logger
+from HasiiMusic.helpers import Track
+
+DB_TIMEOUT = 1.0  # seconds a persistent lookup may take before we give up on it
+DB_BACKOFF = 60  # seconds to skip the persistent tier after it failed
+
+
+class SearchCache:
+    def __init__(self):
+        self.size = max(1, getattr(config, "SEARCH_CACHE_SIZE", 500))
+        self.ttl = getattr(config, "SEARCH_CACHE_TTL_MINUTES", 30) * 60
+        self.db_ttl = getattr(config, "SEARCH_CACHE_DB_TTL_HOURS", 24) * 3600
+        self._memory: OrderedDict[str, Tuple[Track, float]] = OrderedDict()
+        self._writes: Set[asyncio.Task] = set()
+        self._db_down_until = 0.0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.db_errors = 0
+
+    @staticmethod
+    def _collection():
+        from HasiiMusic import db
+
+        return db.searchdb
+
+    def _db_usable(self) -> bool:
+        return self.db_ttl > 0 and time.monotonic() >= self._db_down_until
+
+    def _db_failed(self, action: str, error: Exception) -> None:
+        self.db_errors += 1
+        self._db_down_until = time.monotonic() + DB_BACKOFF
+        logger.debug(f"Search cache {action} failed, skipping the database for {DB_BACKOFF}s: {error!r}")
+
+    # --- Memory tier ---
+    def get(self, key: str) -> Optional[Track]:
+        """Memory lookup. Counts a hit, but not a miss: the caller goes on to load()."""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        track, expires = entry
+        if time.monotonic() >= expires:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self.memory_hits += 1
+        return replace(track)
+
+    def _remember(self, key: str, track: Track) -> None:
+        self._memory[key] = (track, time.monotonic() + self.ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    # --- Persistent tier ---
+    async def load(self, key: str) -> Optional[Track]:
+        """Persistent lookup, promoting a hit into memory. Counts the miss if both tiers miss."""
+        if self._db_usable():
+            try:
+                doc = await asyncio.wait_for(
+                    self._collection().find_one(
+                        {"_id": key, "expires": {"$gt": datetime.now(timezone.utc)}}
+                    ),
+                    timeout=DB_TIMEOUT,
+                )
+            except Exception as e:
+                self._db_failed("lookup", e)
+                doc = None
+            if doc:
+                try:
+                    track = Track(**doc["track"])
+                except (KeyError, TypeError):
+                    track = None
+                if track:
+                    self.db_hits += 1
+                    self._remember(key, track)
+                    return replace(track)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, track: Track) -> None:
+        """Store a fresh search result in memory now and in the database in the background."""
+        # Drop per-request fields so they never leak into another chat's result
+        track = replace(track, file_path=None, message_id=0, time=0, user=None, video=False)
+        self._remember(key, track)
+        if not self._db_usable():
+            return
+        task = asyncio.create_task(self._store(key, track))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _store(self, key: str, track: Track) -> None:
+        doc = {
+            "track": asdict(track),
+            "expires": datetime.now(timezone.utc) + timedelta(seconds=self.db_ttl),
+        }
+        try:
+            await asyncio.wait_for(
+                self._collection().update_one({"_id": key}, {"$set": doc}, upsert=True),
+                timeout=DB_TIMEOUT * 5,
+            )
+        except Exception as e:
+            self._db_failed("write", e)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "size": self.size,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+            "db_errors": self.db_errors,
+            "db_enabled": self._db_usable(),
+        }
@@ -4,63 +4,318 @@
 # This file manages the filesystem cache for downloaded audio/video.
 # Features:
 # - Validates cached files against 0-byte stubs
-# - Locates existing downloads by video ID
+# - Locates existing downloads by video ID through the in-memory index
 # - Cleans up corrupted stubs
+# - Keeps downloads/ under a byte budget with LRU/LFU eviction (LFU spares
+#   recently used files until they had a chance to collect hits)
+# - Never evicts files referenced by a queue or being preloaded
+# - Admits downloads only when the disk has room for them, keeping a
+#   reserve that only now-playing downloads may use
+# - Tracks partial downloads so they resume instead of starting over, and
+#   garbage-collects the ones nobody came back for
 # ==============================================================================
 
 import os
 import glob
-from pathlib import Path
-from typing import Optional
-from HasiiMusic import logger
+import time
+import shutil
+import asyncio
+from typing import Iterable, Optional, Set
+from HasiiMusic import config, logger
+
+from .index import MediaIndex
+
+PARTIAL_GC_INTERVAL = 600  # seconds between sweeps for orphaned partial downloads
+
 
 class StorageManager:
     def __init__(self, min_valid_bytes: int = 4096):
         self.MIN_VALID_BYTES = min_valid_bytes
+        self.index = MediaIndex("downloads")
+        self.index.build()
+        if getattr(config, "DOWNLOAD_INDEX_WATCH", False):
+            self.index.watch()
+
+        self.max_bytes = int(getattr(config, "DOWNLOAD_CACHE_MAX_GB", 0) * 1024 ** 3)
+        self.policy = getattr(config, "DOWNLOAD_CACHE_POLICY", "lru")
+        self.lfu_grace = getattr(config, "DOWNLOAD_CACHE_LFU_GRACE_MINUTES", 30) * 60
+        self._evict_lock = asyncio.Lock()
+        # Originals replaced by a normalised file but still held by a queue (see Transcoder)
+        self.retired: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_reclaimed = 0
+        # Disk admission: keep min_free_bytes free at all times and another
+        # reserve_bytes that background downloads may not use
+        self.min_free_bytes = getattr(config, "DOWNLOAD_MIN_FREE_MB", 100) * 1024 ** 2
+        self.reserve_bytes = getattr(config, "DOWNLOAD_RESERVE_MB", 500) * 1024 ** 2
+        self.deferred = 0
+        self.rejected = 0
+        # Partial downloads untouched for this long are considered abandoned
+        self.partial_ttl = getattr(config, "DOWNLOAD_PARTIAL_TTL_HOURS", 6) * 3600
+        self._last_partial_gc = 0.0
+        self.partials_collected = 0
+        self.partial_bytes_collected = 0
 
     def is_valid_file(self, path: str) -> bool:
         """Return True only if path exists, is a real file, and has enough content.
         Guards against 0-byte stubs and partial writes that cause unexpected EOF in ntgcalls.
+        (Preallocated ranged parts are never indexed; RangedFetcher validates them.)
         """
         try:
-            return os.path.isfile(path) and os.path.getsize(path) >= self.MIN_VALID_BYTES
+            return (
+                os.path.isfile(path)
+                and os.path.getsize(path) >= self.MIN_VALID_BYTES
+            )
         except OSError:
             return False
 
     def delete_stub(self, path: str) -> None:
         """Delete an invalid/corrupt file stub so a fresh download is triggered next time."""
+        self.index.discard(path)
         try:
             os.remove(path)
             logger.warning(f"🗑️ Deleted invalid cached file (too small or corrupt): {path}")
         except OSError:
             pass
 
+    def register(self, video_id: str) -> None:
+        """Index what a download left behind: its final files if it finished,
+        and the partial files it can resume from if it didn't.
+
+        Only called when a download ends, so the glob here never runs on the
+        lookup path.
+        """
+        partials = []
+        for path in glob.glob(f"downloads/{video_id}.*"):
+            if path in self.retired:
+                continue  # replaced by a normalised copy, deleted once no queue holds it
+            if not self.index.add(path):
+                partials.append(path)
+        self.index.set_partials(video_id, partials)
+
+    # --- Partial downloads ---
+    def partial_bytes(self, video_id: str) -> int:
+        """Bytes of video_id already on disk from earlier, interrupted downloads."""
+        return sum(partial.size for partial in self.index.partials(video_id))
+
+    async def collect_partials(self, active: Iterable[str] = ()) -> None:
+        """Delete partial downloads left untouched for DOWNLOAD_PARTIAL_TTL_HOURS.
+
+        Runs at most every PARTIAL_GC_INTERVAL seconds. Videos that are being
+        downloaded, queued or preloaded are skipped even if their partials are old.
+        """
+        now = time.monotonic()
+        if self.partial_ttl <= 0 or now - self._last_partial_gc < PARTIAL_GC_INTERVAL:
+            return
+        self._last_partial_gc = now
+        skip = set(active) | self._pinned()[0]
+        removed, freed = await asyncio.to_thread(self._remove_partials, skip)
+        if removed:
+            logger.info(
+                f"🧹 Removed {removed} abandoned partial download file(s), "
+                f"reclaimed {freed / 1024 ** 2:.1f}MB."
+            )
+
+    def _remove_partials(self, skip: Set[str]) -> tuple[int, int]:
+        cutoff = time.time() - self.partial_ttl
+        removed = freed = 0
+        for video_id, files in self.index.all_partials():
+            if video_id in skip:
+                continue
+            # A download is alive as long as any of its files is still being written
+            newest = 0.0
+            for partial in files:
+                try:
+                    newest = max(newest, os.path.getmtime(partial.path))
+                except OSError:
+                    pass
+            if newest >= cutoff:
+                continue
+            for partial in files:
+                try:
+                    size = os.path.getsize(partial.path)
+                    os.remove(partial.path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.debug(f"Could not remove partial download {partial.path}: {e}")
+                    continue
+                removed += 1
+                freed += size
+            self.index.set_partials(video_id, [])
+        self.partials_collected += removed
+        self.partial_bytes_collected += freed
+        return removed, freed
+
+    def lookup(self, video_id: str, kind: str) -> Optional[str]:
+        """Return the cached path for (video_id, kind) if it is still valid."""
+        cached = self.index.get(video_id, kind)
+        if not cached:
+            return None
+        if not self.is_valid_file(cached.path):
+            if os.path.exists(cached.path):
+                self.delete_stub(cached.path)
+            else:
+                self.index.discard(cached.path)
+            return None
+        self.index.touch(video_id, kind)
+        return cached.path
+
     def locate_download_file(self, video_id: str, video: bool = False) -> Optional[str]:
-        pattern = f"downloads/{video_id}*"
-        candidates = sorted([
-            path for path in glob.glob(pattern)
-            if not path.endswith((".part", ".ytdl", ".info.json", ".temp"))
-        ])
+        return self.lookup(video_id, "video" if video else "audio")
 
-        video_exts = {".mp4", ".mkv", ".mov"}
-        audio_exts = {".m4a", ".webm", ".opus", ".mp3", ".ogg", ".wav", ".flac"}
+    def is_canonical(self, path: Optional[str]) -> bool:
+        """True if path is a cached audio file in the canonical (normalised) format."""
+        cached = self.index.get_path(path) if path else None
+        return bool(cached and cached.canonical)
 
+    def find_cached(self, video_id: str, video: bool = False, count: bool = True) -> Optional[str]:
+        """Cache lookup used by the downloader. Audio falls back to the video container."""
         if video:
-            for path in candidates:
-                if os.path.isdir(path):
-                    continue
-                if Path(path).suffix.lower() in video_exts:
-                    if self.is_valid_file(path):
-                        return path
-                    self.delete_stub(path)
+            path = self.lookup(video_id, "video")
         else:
-            for path in candidates:
-                if os.path.isdir(path):
-                    continue
-                if Path(path).suffix.lower() in audio_exts:
-                    if self.is_valid_file(path):
-                        return path
-                    self.delete_stub(path)
+            path = self.lookup(video_id, "audio") or self.lookup(video_id, "video")
+        if count:
+            if path:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return path
+
+    # --- Eviction ---
+    @staticmethod
+    def _pinned() -> tuple[Set[str], Set[str]]:
+        """Collect (ids, paths) that must survive eviction: queued and preloading tracks."""
+        from HasiiMusic import preload, queue
+
+        ids, paths = queue.referenced()
+        ids |= preload.active_ids()
+        return ids, paths
+
+    def _eviction_candidates(self) -> list:
+        """Unpinned cached files, in the order the eviction policy would drop them."""
+        pinned_ids, pinned_paths = self._pinned()
+        if self.policy == "lfu":
+            # A file used within the grace period goes last whatever its hit count,
+            # otherwise every new download (0 hits) would be the first to go
+            recent = time.time() - self.lfu_grace
+            sort_key = lambda item: (item[1].last_access >= recent, item[1].hits, item[1].last_access)
+        else:
+            sort_key = lambda item: item[1].last_access
+        return [
+            cached for (video_id, _), cached in sorted(self.index.items(), key=sort_key)
+            if video_id not in pinned_ids and cached.path not in pinned_paths
+        ]
+
+    async def _evict(self, bytes_to_free: int) -> int:
+        """Evict unpinned files until at least bytes_to_free are reclaimed. Returns bytes freed."""
+        victims = []
+        planned = 0
+        for cached in self._eviction_candidates():
+            if planned >= bytes_to_free:
+                break
+            victims.append(cached)
+            planned += cached.size
+        if not victims:
+            return 0
+        reclaimed = await asyncio.to_thread(self._remove_files, victims)
+        logger.info(
+            f"🧹 Evicted {len(victims)} cached file(s), reclaimed "
+            f"{reclaimed / 1024 ** 2:.1f}MB (cache {self.index.total_bytes / 1024 ** 3:.2f}GB)."
+        )
+        return reclaimed
+
+    async def enforce_budget(self) -> None:
+        """Evict cached files until downloads/ fits in DOWNLOAD_CACHE_MAX_GB."""
+        if self.max_bytes <= 0:
+            return
+        async with self._evict_lock:
+            total = self.index.total_bytes
+            if total <= self.max_bytes:
+                return
+            # Evict down to 90% of the budget so we don't run again on the next download
+            target = int(self.max_bytes * 0.9)
+            await self._evict(total - target)
+            if self.index.total_bytes > self.max_bytes:
+                logger.warning("⚠️ Download cache is over budget but every file is pinned.")
+
+    # --- Disk admission ---
+    def free_bytes(self) -> int:
+        try:
+            return shutil.disk_usage(self.index.directory).free
+        except OSError:
+            return 0
+
+    def low_on_space(self, estimate: int) -> bool:
+        """Cheap pre-check: True when free space is close enough to the limits that the
+        real file size is worth looking up before downloading."""
+        return self.free_bytes() < self.min_free_bytes + self.reserve_bytes + 4 * estimate
+
+    async def admit(self, expected_bytes: int, background: bool) -> bool:
+        """Make sure a download of expected_bytes fits, evicting cache if needed.
+
+        Background downloads must leave the now-playing reserve untouched and are
+        deferred otherwise; now-playing downloads may use the reserve.
+        """
+        need = expected_bytes + self.min_free_bytes + (self.reserve_bytes if background else 0)
+        free = await asyncio.to_thread(self.free_bytes)
+        if free >= need:
+            return True
+        async with self._evict_lock:
+            free += await self._evict(need - free)
+        if free >= need:
+            return True
+        if background:
+            self.deferred += 1
+            logger.info(
+                f"💾 Deferring background download: {free / 1024 ** 2:.0f}MB free, "
+                f"{need / 1024 ** 2:.0f}MB needed"
+            )
+            return False
+        if free >= expected_bytes + self.min_free_bytes:
+            return True
+        self.rejected += 1
+        logger.error(
+            f"❌ Not enough disk space to download: {free / 1024 ** 2:.0f}MB free, "
+            f"{expected_bytes / 1024 ** 2:.0f}MB needed"
+        )
+        return False
+
+    def _remove_files(self, victims: list) -> int:
+        reclaimed = 0
+        for cached in victims:
+            self.index.discard(cached.path)
+            try:
+                os.remove(cached.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Could not evict {cached.path}: {e}")
+                continue
+            reclaimed += cached.size
+            self.evictions += 1
+        self.bytes_reclaimed += reclaimed
+        return reclaimed
 
-        # No valid file found
-        return None
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        partials = self.index.all_partials()
+        return {
+            "files": len(self.index),
+            "bytes": self.index.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "free_bytes": self.free_bytes(),
+            "deferred": self.deferred,
+            "rejected": self.rejected,
+            "partials": len(partials),
+            "partial_bytes": sum(p.size for _, files in partials for p in files),
+            "partials_collected": self.partials_collected,
+            "partial_bytes_collected": self.partial_bytes_collected,
+        }
@@ -0,0 +1,124 @@
+# ==============================================================================
+# streams.py - Direct Stream URL Resolver
+# ==============================================================================
+# This file resolves direct googlevideo media URLs so tracks can be streamed
+# without writing them to downloads/ first.
+# Features:
+# - Caches resolved URLs per video ID until shortly before they expire
+# - Coalesces concurrent resolutions of the same video
+# - Re-resolves on demand (expiry, 403 mid-stream)
+# - Tells a dead URL (expired, or refused by YouTube) from one that still works
+# ==============================================================================
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+from HasiiMusic import config, logger
+from HasiiMusic.helpers import SingleFlight
+
+DEFAULT_TTL = 3 * 3600  # googlevideo URLs normally live ~6h; assume less if unknown
+PROBE_TIMEOUT = 5  # seconds to wait for googlevideo when checking a URL
+DEAD_STATUSES = {401, 403, 404, 410}
+
+
+@dataclass
+class ResolvedStream:
+    video_id: str
+    url: str
+    expires_at: float
+
+
+class StreamResolver:
+    def __init__(self, cookies_manager, pool, max_entries: int = 1024):
+        self._cookies = cookies_manager
+        self._pool = pool
+        self._max_entries = max_entries
+        self._by_id: OrderedDict[str, ResolvedStream] = OrderedDict()
+        self._by_url: dict[str, str] = {}
+        self._flights = SingleFlight()
+        self.margin = getattr(config, "DIRECT_STREAM_REFRESH_MARGIN", 600)
+        self.resolved = 0
+        self.refreshed = 0
+
+    @staticmethod
+    def _expiry(url: str) -> float:
+        try:
+            return float(parse_qs(urlparse(url).query)["expire"][0])
+        except (KeyError, IndexError, ValueError):
+            return time.time() + DEFAULT_TTL
+
+    def is_stream(self, path: Optional[str]) -> bool:
+        return bool(path) and path in self._by_url
+
+    async def resolve(self, video_id: str, min_ttl: int = 0, force: bool = False) -> Optional[str]:
+        """Return a direct audio URL for video_id, valid for at least min_ttl + margin seconds."""
+        cached = self._by_id.get(video_id)
+        if cached and not force:
+            if cached.expires_at - time.time() > min_ttl + self.margin:
+                self._by_id.move_to_end(video_id)
+                return cached.url
+        if cached:
+            self.refreshed += 1
+        return await self._flights.do(video_id, lambda: self._resolve(video_id))
+
+    async def refresh(self, url: str, min_ttl: int = 0, force: bool = False) -> Optional[str]:
+        """Given a URL handed out earlier, return a fresh one if it is expiring (or force)."""
+        video_id = self._by_url.get(url)
+        if not video_id:
+            return url
+        return await self.resolve(video_id, min_ttl=min_ttl, force=force)
+
+    async def is_dead(self, url: str) -> bool:
+        """True if url has expired or googlevideo refuses it. A URL that can't be
+        checked (network trouble) is not reported as dead."""
+        if self._expiry(url) <= time.time():
+            return True
+        try:
+            timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url, headers={"Range": "bytes=0-0"}) as resp:
+                    return resp.status in DEAD_STATUSES
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def _resolve(self, video_id: str) -> Optional[str]:
+        ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "cookiefile": self._cookies.get_cookies(),
+            "format": "bestaudio/best",
+            "noplaylist": True,
+            "socket_timeout": 20,
+            "extractor_retries": 3,
+        }
+        try:
+            info = await self._pool.extract(f"https://www.youtube.com/watch?v={video_id}", ydl_opts)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not resolve stream URL for {video_id}: {e}")
+            return None
+        url = info.get("url") if info else None
+        if not url:
+            return None
+
+        self._by_id.pop(video_id, None)
+        self._by_id[video_id] = ResolvedStream(video_id, url, self._expiry(url))
+        # Older URLs stay mapped so tracks still holding them can be refreshed
+        self._by_url[url] = video_id
+        while len(self._by_id) > self._max_entries:
+            self._by_id.popitem(last=False)
+        while len(self._by_url) > self._max_entries * 2:
+            self._by_url.pop(next(iter(self._by_url)))
+        self.resolved += 1
+        return url
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._by_id),
+            "resolved": self.resolved,
+            "refreshed": self.refreshed,
+        }
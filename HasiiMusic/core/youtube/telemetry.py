@@ -0,0 +1,98 @@
+# ==============================================================================
+# telemetry.py - Download Telemetry
+# ==============================================================================
+# This file records one structured event per Downloader.download() call and
+# aggregates them for the /dlstats command and the metrics endpoint.
+# Features:
+# - Queue wait, time-to-first-byte, total time, bytes and throughput
+# - Cookie file, format, cache outcome and result of every download
+# - p50/p95/p99 over a rolling window of recent downloads
+# - Error rates broken down by cause
+# ==============================================================================
+
+import json
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Optional
+from HasiiMusic import logger
+
+
+@dataclass
+class DownloadEvent:
+    video_id: str
+    kind: str                     # "audio", "video" or "live"
+    priority: str
+    cache: str = "miss"           # "hit", "miss", "coalesced" or "negative"
+    result: str = "ok"            # "ok" or the failure cause
+    queue_wait: float = 0.0
+    ttfb: Optional[float] = None
+    total: float = 0.0
+    bytes: int = 0
+    resumed: int = 0              # bytes already on disk from an interrupted download
+    throughput: float = 0.0       # bytes/sec while transferring
+    cookie: Optional[str] = None
+    format: Optional[str] = None
+    started: float = field(default_factory=time.monotonic, repr=False)
+
+    def fail(self, cause: str) -> None:
+        if self.result == "ok":
+            self.result = cause
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        name: round(values[min(last, int(q * len(values)))], 3)
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+class DownloadTelemetry:
+    def __init__(self, window: int = 2000):
+        self._events: Deque[DownloadEvent] = deque(maxlen=window)
+        self.total = 0
+        self.results: Counter = Counter()
+        self.cache: Counter = Counter()
+
+    def record(self, event: DownloadEvent) -> None:
+        event.total = time.monotonic() - event.started
+        transfer = event.total - event.queue_wait - (event.ttfb or 0)
+        if event.bytes and transfer > 0:
+            event.throughput = event.bytes / transfer
+        self._events.append(event)
+        self.total += 1
+        self.results[event.result] += 1
+        self.cache[event.cache] += 1
+        logger.debug("download_event %s", json.dumps(
+            {k: v for k, v in asdict(event).items() if k != "started"}, default=str
+        ))
+
+    def summary(self) -> dict:
+        events = list(self._events)
+        fetched = [e for e in events if e.cache == "miss" and e.result == "ok"]
+        failures = Counter(e.result for e in events if e.result != "ok")
+        recent = len(events)
+        return {
+            "downloads": self.total,
+            "window": recent,
+            "cache": dict(self.cache),
+            "results": dict(self.results),
+            "error_rate": round(sum(failures.values()) / recent, 4) if recent else 0.0,
+            "error_rates": {
+                cause: round(count / recent, 4) for cause, count in failures.most_common()
+            },
+            "latency": {
+                "total": percentiles([e.total for e in events]),
+                "fetch_total": percentiles([e.total for e in fetched]),
+                "queue_wait": percentiles([e.queue_wait for e in fetched]),
+                "ttfb": percentiles([e.ttfb for e in fetched if e.ttfb is not None]),
+            },
+            "throughput": percentiles([e.throughput for e in fetched if e.throughput]),
+            "bytes": sum(e.bytes for e in fetched),
+            "resumed": sum(1 for e in events if e.resumed),
+            "resumed_bytes": sum(e.resumed for e in events),
+        }
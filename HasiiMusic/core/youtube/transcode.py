@@ -0,0 +1,187 @@
+# ==============================================================================
+# transcode.py - Cached Media Transcoder
+# ==============================================================================
+# This file runs ffmpeg over files already in downloads/.
+# Features:
+# - Derives an audio-only file from a cached video by stream-copy remux
+# - Normalises downloaded audio to Ogg/Opus 48 kHz stereo so playback can
+#   skip most of ffmpeg's probing, in the background; originals still queued
+#   in some chat are only deleted once no queue holds them
+# - Muxes video/audio parts fetched by the ranged downloader
+# - Registers derived files in the cache index for instant later hits
+# - Bounds how many ffmpeg processes run at once
+# ==============================================================================
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Set
+from HasiiMusic import config, logger
+
+from .index import CANONICAL_EXT
+
+FFMPEG = shutil.which("ffmpeg")
+# yt-dlp's bestaudio .webm is Opus already and only needs a container change
+OPUS_SOURCES = {".webm", ".opus", ".ogg"}
+
+
+class Transcoder:
+    def __init__(self, storage_manager, max_jobs: int = 2):
+        self._storage = storage_manager
+        self._jobs = asyncio.Semaphore(max(1, getattr(config, "AUDIO_NORMALIZE_JOBS", max_jobs)))
+        self._pending: Dict[str, asyncio.Task] = {}
+        # Originals replaced by a normalised file but still held by a queue;
+        # shared with storage so register() never indexes them again
+        self._retired: Set[str] = storage_manager.retired
+        self.bitrate = getattr(config, "AUDIO_NORMALIZE_BITRATE", "128k")
+        self.remuxed = 0
+        self.normalized = 0
+        self.failed = 0
+
+    @property
+    def available(self) -> bool:
+        return FFMPEG is not None
+
+    async def _run(self, *args: str, timeout: int = 120) -> bool:
+        async with self._jobs:
+            proc = await asyncio.create_subprocess_exec(
+                FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", *args,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, err = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                logger.warning(f"⏱️ ffmpeg timed out: {' '.join(args[:4])}")
+                return False
+            if proc.returncode != 0:
+                logger.debug(f"ffmpeg failed ({proc.returncode}): {err.decode(errors='ignore')[-300:]}")
+                return False
+            return True
+
+    async def remux_audio(self, video_id: str, video_path: str) -> Optional[str]:
+        """Copy the audio stream of a cached video into downloads/<id>.m4a without re-encoding."""
+        if not self.available:
+            return None
+        # "<id>.remux.m4a" is not an indexable name, so a half-written file is never served
+        temp = f"downloads/{video_id}.remux.m4a"
+        final = f"downloads/{video_id}.m4a"
+        # mp4 (rather than ipod) also accepts Opus audio merged into the container
+        ok = await self._run("-i", video_path, "-map", "0:a:0", "-vn", "-c:a", "copy", "-f", "mp4", temp)
+        if not ok or not self._storage.is_valid_file(temp):
+            self.failed += 1
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return None
+        os.replace(temp, final)
+        self._storage.index.add(final)
+        self.remuxed += 1
+        logger.info(f"🎵 Derived audio for {video_id} from its cached video")
+        return final
+
+    async def merge(self, video_id: str, parts: list[str]) -> Optional[str]:
+        """Mux separately downloaded video and audio parts into downloads/<id>.mp4."""
+        if not self.available:
+            return None
+        temp = f"downloads/{video_id}.merge.mp4"
+        final = f"downloads/{video_id}.mp4"
+        inputs = [arg for part in parts for arg in ("-i", part)]
+        maps = ["-map", "0:v:0", "-map", f"{len(parts) - 1}:a:0"]
+        ok = await self._run(*inputs, *maps, "-c", "copy", "-movflags", "+faststart", "-f", "mp4", temp, timeout=300)
+        if not ok or not self._storage.is_valid_file(temp):
+            self.failed += 1
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return None
+        os.replace(temp, final)
+        for part in parts:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+        self._storage.index.add(final)
+        return final
+
+    async def normalize(self, video_id: str, path: str) -> Optional[str]:
+        """Store a downloaded audio file as downloads/<id>.opus and drop the original.
+
+        Returns the canonical path, or None if ffmpeg is missing or failed (the
+        original file is then left untouched).
+        """
+        if not self.available or path.endswith(CANONICAL_EXT):
+            return None
+        temp = f"downloads/{video_id}.norm{CANONICAL_EXT}"
+        final = f"downloads/{video_id}{CANONICAL_EXT}"
+        out = ["-map", "0:a:0", "-vn", "-f", "ogg", temp]
+
+        ok = False
+        if Path(path).suffix.lower() in OPUS_SOURCES:
+            ok = await self._run("-i", path, "-c:a", "copy", *out)
+        if not ok:
+            ok = await self._run(
+                "-i", path, "-c:a", "libopus", "-b:a", self.bitrate, "-ar", "48000", "-ac", "2",
+                *out, timeout=300,
+            )
+        if not ok or not self._storage.is_valid_file(temp):
+            self.failed += 1
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return None
+
+        os.replace(temp, final)
+        self._storage.index.discard(path)
+        self._storage.index.add(final)
+        self._retired.add(path)
+        self.collect_retired()
+        self.normalized += 1
+        return final
+
+    def normalize_later(self, video_id: str, path: str) -> None:
+        """Schedule normalize() in the background, once per video."""
+        key = f"{video_id}:normalize"
+        if not self.available or path.endswith(CANONICAL_EXT) or key in self._pending:
+            return
+        task = asyncio.create_task(self.normalize(video_id, path))
+        self._pending[key] = task
+        task.add_done_callback(lambda _t, k=key: self._pending.pop(k, None))
+
+    def collect_retired(self) -> None:
+        """Delete replaced originals that no queue refers to any more. A cache hit
+        may have handed one to another chat before it was normalised."""
+        from HasiiMusic import queue
+
+        _, in_use = queue.referenced()
+        for path in list(self._retired):
+            if path in in_use:
+                continue
+            self._retired.discard(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def derive_audio(self, video_id: str, video_path: str) -> None:
+        """Schedule remux_audio() in the background, once per video."""
+        if not self.available or video_id in self._pending:
+            return
+        task = asyncio.create_task(self.remux_audio(video_id, video_path))
+        self._pending[video_id] = task
+        task.add_done_callback(lambda _t, v=video_id: self._pending.pop(v, None))
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._pending),
+            "remuxed": self.remuxed,
+            "normalized": self.normalized,
+            "retired": len(self._retired),
+            "failed": self.failed,
+        }
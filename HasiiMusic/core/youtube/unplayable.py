@@ -0,0 +1,118 @@
+# ==============================================================================
+# unplayable.py - Negative Cache for Unplayable Videos
+# ==============================================================================
+# This file remembers videos YouTube refused to serve (private, removed,
+# region-blocked, age-gated, members-only), so queueing one again fails at
+# once instead of going through every yt-dlp retry first.
+# Features:
+# - Classifies yt-dlp errors; transient failures (timeouts, bot checks,
+#   throttling) are never cached, even when worded as "video unavailable"
+# - A TTL per error class: removed videos stay removed, an age gate may be
+#   passed once cookies are added, a premiere starts playing soon, and a
+#   refusal that gives no reason is only remembered briefly
+# - Keyed by video ID and error class, bounded LRU
+# ==============================================================================
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from HasiiMusic import config, logger
+
+CACHE_SIZE = 4096
+
+# Throttling and bot checks, which YouTube words like an unavailable video
+# ("Video unavailable. This content isn't available, try again later")
+_TRANSIENT = (
+    "try again later", "not a bot", "rate limit", "rate-limit",
+    "too many requests", "http error 429", "temporarily unavailable",
+)
+
+# (error class, lowercase fragments of the yt-dlp error message), checked in order
+_CLASSES = (
+    ("removed", (
+        "has been removed by the uploader", "account associated with this video has been terminated",
+        "copyright claim",
+    )),
+    ("private", ("private video", "this video is private")),
+    ("region", (
+        "not available in your country", "blocked it in your country",
+        "not made this video available in your country", "geo restrict",
+    )),
+    ("age_restricted", ("confirm your age", "age-restricted", "age restricted", "inappropriate for some users")),
+    ("members_only", ("members-only", "join this channel", "available to this channel's members")),
+    ("premiere", ("premieres in", "live event will begin", "premiere will begin")),
+    # YouTube's generic refusal, when it doesn't say why
+    ("unavailable", ("video unavailable", "no longer available", "does not exist", "has been removed")),
+)
+
+# Seconds each error class is remembered for
+TTLS = {
+    "removed": 24 * 3600,
+    "private": 6 * 3600,
+    "region": 12 * 3600,
+    "age_restricted": 3600,  # may play once age-verified cookies are added
+    "members_only": 6 * 3600,
+    "premiere": 600,
+    "unavailable": 900,  # no reason given: may be a refusal we don't recognise as transient
+}
+
+
+def classify(error) -> Optional[str]:
+    """Error class of a yt-dlp failure, or None if it may well succeed on retry."""
+    message = str(error).lower()
+    if any(fragment in message for fragment in _TRANSIENT):
+        return None
+    if "sign in to confirm" in message and "confirm your age" not in message:
+        return None  # a bot check; the age gate is worded "sign in to confirm your age"
+    for name, fragments in _CLASSES:
+        if any(fragment in message for fragment in fragments):
+            return name
+    return None
+
+
+class UnplayableCache:
+    def __init__(self):
+        self.enabled = getattr(config, "UNPLAYABLE_CACHE", True)
+        # {video_id: (error class, expiry)}
+        self._entries: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.marked = 0
+
+    def get(self, video_id: str, count: bool = True) -> Optional[str]:
+        """The error class video_id failed with, if it is still remembered."""
+        entry = self._entries.get(video_id)
+        if entry is None:
+            return None
+        reason, expires = entry
+        if time.monotonic() >= expires:
+            del self._entries[video_id]
+            return None
+        if count:
+            self.hits += 1
+        return reason
+
+    def mark(self, video_id: str, error) -> Optional[str]:
+        """Remember video_id as unplayable if error says so. Returns the error class."""
+        reason = classify(error)
+        if not reason or not self.enabled or not video_id:
+            return reason
+        self._entries[video_id] = (reason, time.monotonic() + TTLS[reason])
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > CACHE_SIZE:
+            self._entries.popitem(last=False)
+        self.marked += 1
+        logger.info(f"🚫 {video_id} is unplayable ({reason}), skipping it for {TTLS[reason] // 60} minutes")
+        return reason
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        by_reason: dict = {}
+        for reason, expires in self._entries.values():
+            if expires > now:
+                by_reason[reason] = by_reason.get(reason, 0) + 1
+        return {
+            "entries": sum(by_reason.values()),
+            "by_reason": by_reason,
+            "hits": self.hits,
+            "marked": self.marked,
+        }
@@ -0,0 +1,162 @@
+# ==============================================================================
+# worker.py - yt-dlp Worker Process
+# ==============================================================================
+# Standalone worker run by ExtractorPool as a child process. It keeps warm
+# YoutubeDL instances around between jobs and speaks JSON lines:
+#   stdin:  {"id": 1, "url": "...", "opts": {...}, "download": false}
+#   stdout: {"id": 1, "ok": true, "info": {...}}
+#           {"id": 1, "ok": false, "error": "DownloadError", "message": "..."}
+#           {"id": 1, "progress": true}   (heartbeat while a download runs)
+#
+# This file must not import HasiiMusic: it is executed by path so the child
+# never runs the bot's package initialisation.
+# ==============================================================================
+
+import sys
+
+if __name__ == "__main__":
+    # Don't let sibling modules (utils.py, search.py, ...) shadow real packages
+    sys.path.pop(0)
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import yt_dlp
+
+MAX_INSTANCES = 8  # warm YoutubeDL instances kept per worker (one per option set)
+TIMING_KEY = "_download_timing"  # added to the info dict of downloads
+HEARTBEAT_INTERVAL = 10  # seconds between progress lines while downloading
+
+
+class _Progress:
+    """Collects time-to-first-byte and byte counts from yt-dlp progress hooks."""
+
+    def __init__(self):
+        self.on_progress = None  # called at most every HEARTBEAT_INTERVAL while downloading
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.first_byte = None
+        self.bytes = 0
+        self._beat = self.started
+
+    def hook(self, d: dict) -> None:
+        status = d.get("status")
+        if status == "downloading" and self.on_progress:
+            now = time.monotonic()
+            if now - self._beat >= HEARTBEAT_INTERVAL:
+                self._beat = now
+                self.on_progress()
+        if status == "downloading" and self.first_byte is None and d.get("downloaded_bytes"):
+            self.first_byte = time.monotonic()
+        elif status == "finished":
+            self.bytes += d.get("total_bytes") or d.get("downloaded_bytes") or 0
+
+    def timing(self) -> dict:
+        ttfb = self.first_byte - self.started if self.first_byte is not None else None
+        return {"ttfb": ttfb, "bytes": self.bytes, "seconds": time.monotonic() - self.started}
+
+
+def _result(ydl: yt_dlp.YoutubeDL, info: dict | None, progress: _Progress, download: bool) -> dict | None:
+    if not info:
+        return None
+    info = ydl.sanitize_info(info)
+    if download:
+        info[TIMING_KEY] = progress.timing()
+    return info
+
+
+def _check_cancel(cancel: threading.Event) -> None:
+    if cancel.is_set():
+        raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+
+
+def extract(
+    opts: dict, url: str, download: bool = False, cancel: threading.Event | None = None
+) -> dict | None:
+    """Run a single extraction with a fresh YoutubeDL. Used when the pool is disabled.
+
+    Setting cancel stops a download at its next progress update, leaving the
+    ".part" file in place for yt-dlp to resume from later.
+    """
+    progress = _Progress()
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.add_progress_hook(progress.hook)
+        if cancel is not None:
+            ydl.add_progress_hook(lambda _d: _check_cancel(cancel))
+        info = ydl.extract_info(url, download=download)
+        return _result(ydl, info, progress, download)
+
+
+class _WarmExtractor:
+    def __init__(self):
+        self._instances: "OrderedDict[str, yt_dlp.YoutubeDL]" = OrderedDict()
+        # Jobs run one at a time, so every instance can share one collector
+        self.progress = _Progress()
+
+    def get(self, opts: dict) -> yt_dlp.YoutubeDL:
+        key = json.dumps(opts, sort_keys=True, default=str)
+        ydl = self._instances.get(key)
+        if ydl is not None:
+            self._instances.move_to_end(key)
+            return ydl
+        ydl = yt_dlp.YoutubeDL(opts)
+        ydl.add_progress_hook(self.progress.hook)
+        self._instances[key] = ydl
+        if len(self._instances) > MAX_INSTANCES:
+            _, old = self._instances.popitem(last=False)
+            try:
+                old.close()
+            except Exception:
+                pass
+        return ydl
+
+    def run(self, opts: dict, url: str, download: bool) -> dict | None:
+        ydl = self.get(opts)
+        self.progress.reset()
+        info = ydl.extract_info(url, download=download)
+        return _result(ydl, info, self.progress, download)
+
+
+def main() -> None:
+    out = sys.stdout
+    # yt-dlp and its extractors may print; keep the protocol channel clean
+    sys.stdout = sys.stderr
+    warm = _WarmExtractor()
+    # Fragment downloads call progress hooks from their own threads
+    write_lock = threading.Lock()
+
+    def send(reply: dict) -> None:
+        with write_lock:
+            out.write(json.dumps(reply, default=str) + "\n")
+            out.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError:
+            continue
+        # Tells the pool a long download is still making progress
+        warm.progress.on_progress = lambda job_id=job.get("id"): send({"id": job_id, "progress": True})
+        try:
+            info = warm.run(job["opts"], job["url"], job.get("download", False))
+            reply = {"id": job.get("id"), "ok": True, "info": info}
+        except Exception as ex:
+            reply = {
+                "id": job.get("id"),
+                "ok": False,
+                "error": type(ex).__name__,
+                "message": str(ex),
+            }
+        warm.progress.on_progress = None
+        send(reply)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@
 
 from ._admins import admin_check, can_manage_vc, is_admin, reload_admins
 from ._dataclass import Media, Track
+from ._flight import SingleFlight
 from ._inline import Inline
+from ._query import normalize_query
 from ._queue import Queue
 from ._thumbnails import Thumbnail
 from ._utilities import Utilities
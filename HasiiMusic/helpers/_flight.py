@@ -0,0 +1,68 @@
+# ==============================================================================
+# _flight.py - Single-Flight Request Coalescing
+# ==============================================================================
+# When many chats ask for the same thing at once (same search, same video,
+# same Spotify track), only the first request does the work and everyone
+# else awaits its result. Entries are reference-counted and dropped as soon
+# as the work finishes, so memory stays flat no matter how many keys we see.
+# ==============================================================================
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0   # calls that actually ran the work
+        self.coalesced = 0  # calls that joined an in-flight one
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def keys(self) -> list:
+        return list(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            # Run the work in its own task so one waiter being cancelled
+            # doesn't cancel it for everybody else.
+            call = _Call(asyncio.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, k=key, c=call: self._forget(k, c))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is interested any more
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
@@ -62,7 +62,13 @@ class PreloadManager:
             # Download the track
             if not media.file_path:
                 import re
-                if not re.fullmatch(r"[A-Za-z0-9_-]{11}", media.id) or not getattr(media, "thumbnail", None):
+                if re.fullmatch(r"[A-Za-z0-9_-]{11}", media.id):
+                    if not getattr(media, "thumbnail", None):
+                        try:
+                            await yt.hydrate_track(media)
+                        except Exception:
+                            pass
+                else:
                     try:
                         resolved = await yt.search(media.id, 0)
                         if resolved:
@@ -74,9 +80,12 @@ class PreloadManager:
                                 media.duration = resolved.duration
                     except Exception:
                         pass
-                media.file_path = await yt.download(
+                from HasiiMusic.core.youtube import Priority
+                # fetch() lets the stream resolver answer instead in direct-stream mode
+                media.file_path = await yt.fetch(
                     media.id,
                     video=getattr(media, "video", False),
+                    priority=Priority.PRELOAD,
                 )
                 if media.file_path:
                     self._preloaded.setdefault(chat_id, set()).add(media.id)
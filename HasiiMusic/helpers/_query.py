@@ -0,0 +1,90 @@
+# ==============================================================================
+# _query.py - Search Query Normalisation
+# ==============================================================================
+# Maps the many ways people type the same request to one canonical key, so
+# the search cache, single-flight coalescing and Spotify resolution all treat
+# them as the same thing.
+#   "Shape of You", "shape of you " and "Shape Of You (Official Video)"
+#       -> "q:of shape you"
+#   "Ed Sheeran - Shape of You" and "shape of you ed sheeran"
+#       -> "q:ed of shape sheeran you"
+#   youtu.be/<id>, youtube.com/watch?v=<id>&t=30, music.youtube.com/...
+#       -> "yt:<id>"
+#   open.spotify.com/intl-de/track/<id>?si=..., spotify:track:<id>
+#       -> "spotify:track:<id>"
+# Accents are only folded on Latin letters and only Latin queries have their
+# words sorted: vowel signs and word order matter in Devanagari, Tamil, etc.
+# ==============================================================================
+
+import re
+import unicodedata
+
+_YOUTUBE = re.compile(
+    r"(?:https?://)?(?:www\.|m\.|music\.)?"
+    r"(?:youtube\.com/(?:watch\?(?:[^\s#]*&)?v=|shorts/|live/|embed/)|youtu\.be/)"
+    r"([A-Za-z0-9_-]{11})"
+)
+_SPOTIFY = re.compile(
+    r"(?:(?:https?://)?(?:open\.)?spotify\.com/(?:intl-[a-zA-Z-]+/)?|spotify:)"
+    r"(playlist|track|album|artist)[/:]([a-zA-Z0-9]+)"
+)
+# Words that don't change which song someone wants
+_NOISE = re.compile(
+    r"\b(?:official\s+(?:music\s+|lyrics?\s+|hd\s+)?(?:video|audio)|lyrics?\s+video"
+    r"|with\s+lyrics|lyrics|visuali[sz]er|hd|hq|4k|1080p|720p)\b"
+)
+_FEAT = re.compile(r"\b(?:featuring|feat|ft)\b")
+_JOINERS = "\u200c\u200d"  # ZWNJ/ZWJ shape conjuncts inside Indic words
+
+
+def _is_latin(ch: str) -> bool:
+    return ch.isascii() or "LATIN" in unicodedata.name(ch, "")
+
+
+def _fold(text: str) -> str:
+    """Case-fold and strip accents from Latin letters ("Beyoncé" -> "beyonce").
+    Marks on other scripts (Devanagari/Tamil vowel signs, viramas, nuktas) change
+    the word, so they are kept."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    kept = []
+    base_latin = False
+    for ch in text:
+        if unicodedata.category(ch).startswith("M"):
+            if base_latin:
+                continue
+        else:
+            base_latin = _is_latin(ch)
+        kept.append(ch)
+    return unicodedata.normalize("NFKC", "".join(kept))
+
+
+def _words(text: str) -> str:
+    """Replace whitespace, punctuation and symbols with spaces; letters, digits,
+    combining marks and zero-width joiners stay together so a word is never
+    split at a vowel sign or a Sinhala conjunct."""
+    return "".join(
+        ch if unicodedata.category(ch)[0] in "LNM" or ch in _JOINERS else " " for ch in text
+    )
+
+
+def normalize_query(query: str) -> str:
+    """Canonical key for a search query or media link."""
+    query = (query or "").strip()
+    match = _YOUTUBE.search(query)
+    if match:
+        return f"yt:{match.group(1)}"
+    match = _SPOTIFY.search(query)
+    if match:
+        return f"spotify:{match.group(1)}:{match.group(2)}"
+
+    folded = _fold(query)
+    words = _FEAT.sub("feat", _NOISE.sub(" ", _words(folded)))
+    tokens = words.split()
+    if not tokens:
+        # Nothing left but noise ("lyrics"); keep what the user typed
+        tokens = folded.split()
+    # Word order rarely changes the top result ("artist - title" vs "title artist").
+    # Only reorder Latin queries: elsewhere the order may be all that tells titles apart.
+    if all(_is_latin(ch) for token in tokens for ch in token):
+        tokens = sorted(tokens)
+    return "q:" + " ".join(tokens)
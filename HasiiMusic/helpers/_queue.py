@@ -78,6 +78,18 @@ class Queue:
         queue_list = list(self.queues[chat_id])
         return queue_list[1:min(len(queue_list), count + 1)]
     
+    def referenced(self) -> tuple[set[str], set[str]]:
+        # (ids, file paths) of every item queued in any chat, used to pin
+        # cached downloads against eviction
+        ids, paths = set(), set()
+        for items in list(self.queues.values()):
+            for item in list(items):
+                if item.id:
+                    ids.add(item.id)
+                if item.file_path:
+                    paths.add(item.file_path)
+        return ids, paths
+
     @staticmethod
     def is_downloaded(item: MediaItem) -> bool:
         return bool(getattr(item, 'file_path', None))
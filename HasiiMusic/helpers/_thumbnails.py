@@ -68,6 +68,11 @@ class Thumbnail:
 
     async def generate(self, song: Track, size=(1280, 720)) -> str:
         try:
+            from HasiiMusic import yt
+
+            # Thumbnail URL, views and duration are usually known from the
+            # search, inline result or download that queued the track
+            await yt.fill(song)
             thumb_url = getattr(song, "thumbnail", "")
             if not thumb_url:
                 if re.fullmatch(r"[A-Za-z0-9_-]{11}", song.id):
@@ -0,0 +1,94 @@
+# ==============================================================================
+# dlstats.py - Download Pipeline Stats
+# ==============================================================================
+# Sudo-only view of download latency, throughput, errors and cache health.
+# Use "/dlstats json" for the raw numbers (sent as a file when too long).
+# ==============================================================================
+
+import html
+import io
+import json
+
+from pyrogram import filters, types
+
+from HasiiMusic import app, yt
+
+
+MESSAGE_LIMIT = 4096  # Telegram's limit on message text
+
+
+def _ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}ms"
+
+
+def _pct(block: dict, fmt=_ms) -> str:
+    return " / ".join(fmt(block.get(k)) for k in ("p50", "p95", "p99"))
+
+
+def _speed(value) -> str:
+    return "-" if value is None else f"{value / 1024 ** 2:.1f}MB/s"
+
+
+@app.on_message(filters.command(["dlstats"]) & app.sudo_filter)
+async def _dlstats(_, m: types.Message):
+    # Auto-delete command message
+    try:
+        await m.delete()
+    except Exception:
+        pass
+
+    stats = yt.stats()
+    if len(m.command) > 1 and m.command[1].lower() == "json":
+        raw = json.dumps(stats, indent=1, default=str)
+        # Cookie paths and error messages may contain "<" or "&"
+        text = f"<pre>{html.escape(raw)}</pre>"
+        if len(text) <= MESSAGE_LIMIT:
+            return await m.reply_text(text)
+        document = io.BytesIO(raw.encode())
+        document.name = "dlstats.json"
+        return await m.reply_document(document, caption="📥 Download pipeline stats")
+
+    dl = stats["downloads"]
+    lat = dl["latency"]
+    cache = stats["cache"]
+    pool = stats["pool"]
+    sched = stats["scheduler"]
+    errors = ", ".join(f"{k} {v:.1%}" for k, v in dl["error_rates"].items()) or "none"
+    waiting = sum(sched["waiting"].values())
+
+    await m.reply_text(
+        "<blockquote><b>📥 Downloads</b> (last {window} of {total})\n"
+        "Cache: {hit} hit • {miss} miss • {coalesced} coalesced\n"
+        "Errors: {error_rate:.1%} ({errors})\n\n"
+        "<b>⏱ p50 / p95 / p99</b>\n"
+        "Total: {total_lat}\n"
+        "Fetch: {fetch_lat}\n"
+        "Queue wait: {wait_lat}\n"
+        "First byte: {ttfb_lat}\n"
+        "Throughput: {speed}\n\n"
+        "<b>🗂 Cache</b>: {files} files • {size:.2f}GB • hit ratio {ratio:.0%}\n"
+        "<b>⚙️ Workers</b>: {workers} • queue {depth} • avg job {avg}s\n"
+        "<b>🎚 Slots</b>: {active}/{slots} busy • {waiting} waiting</blockquote>".format(
+            window=dl["window"],
+            total=dl["downloads"],
+            hit=dl["cache"].get("hit", 0),
+            miss=dl["cache"].get("miss", 0),
+            coalesced=dl["cache"].get("coalesced", 0),
+            error_rate=dl["error_rate"],
+            errors=errors,
+            total_lat=_pct(lat["total"]),
+            fetch_lat=_pct(lat["fetch_total"]),
+            wait_lat=_pct(lat["queue_wait"]),
+            ttfb_lat=_pct(lat["ttfb"]),
+            speed=_pct(dl["throughput"], _speed),
+            files=cache["files"],
+            size=cache["bytes"] / 1024 ** 3,
+            ratio=cache["hit_ratio"],
+            workers=pool["workers"] or "threads",
+            depth=pool["queue_depth"],
+            avg=pool["avg_job_seconds"],
+            active=sched["active"],
+            slots=sched["slots"],
+            waiting=waiting,
+        )
+    )
@@ -168,7 +168,7 @@ async def _controls(_, query: types.CallbackQuery):
 
         msg = await app.send_message(chat_id=chat_id, text=query.lang["play_next"])
         if not media.file_path:
-            media.file_path = await yt.download(
+            media.file_path = await yt.fetch(
                 media.id,
                 video=getattr(media, "video", False),
             )
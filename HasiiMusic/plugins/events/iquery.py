@@ -2,13 +2,16 @@
 # iquery.py - Inline Queries
 # ==============================================================================
 # Lets users type @botname in any chat to search YouTube and share tracks.
+# Searches are debounced and cached per query (see core/youtube/inline.py),
+# and answers are cached by Telegram for INLINE_CACHE_TIME seconds.
+# Picking a result warms the download cache for it (needs inline feedback
+# enabled for the bot in @BotFather). Flat search entries are completed
+# from the track metadata store (thumbnail, duration, views) when known.
 # ==============================================================================
 
-import asyncio
-import yt_dlp
 from pyrogram import types
 
-from HasiiMusic import app, yt
+from HasiiMusic import app, config, yt
 from HasiiMusic.helpers import buttons, utils
 
 
@@ -19,36 +22,35 @@ async def inline_query_handler(_, query: types.InlineQuery):
         return
 
     try:
-        def _extract():
-            cookie = yt.get_cookies() if yt.checked else None
-            ydl_opts = {
-                "quiet": True,
-                "extract_flat": True,
-                "cookiefile": cookie
-            }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                return ydl.extract_info(f"ytsearch15:{text}", download=False)
-
-        results = await asyncio.to_thread(_extract)
-        if not results or "entries" not in results:
+        # None: no results, or the user kept typing and a newer query took over
+        entries = await yt.inline_search(query.from_user.id, text)
+        if not entries:
             return
 
         answers = []
-        for video in results["entries"]:
-            if not video:
+        # Telegram rejects the whole answer if a result id repeats, and merged or
+        # prefix-cached results can list the same video twice
+        seen = set()
+        for video in entries:
+            if not video or not video.get("id") or video["id"] in seen:
                 continue
-                
+            seen.add(video["id"])
+            known = yt.known(video["id"])
+
             title = video.get("title", "Unknown Title").title()
             
             duration_sec = video.get("duration")
             is_live = video.get("is_live", False)
             if duration_sec is None and is_live:
                 duration = "LIVE"
+            elif duration_sec:
+                duration = utils.format_duration(int(duration_sec))
             else:
-                duration = utils.format_duration(int(duration_sec)) if duration_sec else "0:00"
-                
-            views = str(video.get("view_count", "N/A"))
+                duration = known.duration if known else "0:00"
+
+            views = str(video.get("view_count") or (known and known.view_count) or "N/A")
             thumbnail = video.get("thumbnails", [{}])[-1].get("url", "").split("?")[0] if video.get("thumbnails") else ""
+            thumbnail = thumbnail or (known.thumbnail if known else "")
             channel = video.get("uploader", "Unknown Channel")
             channellink = video.get("uploader_url", "https://youtube.com")
             link = video.get("url") or video.get("webpage_url") or f"https://youtube.com/watch?v={video.get('id')}"
@@ -65,6 +67,7 @@ async def inline_query_handler(_, query: types.InlineQuery):
 
             answers.append(
                 types.InlineQueryResultPhoto(
+                    id=video.get("id"),
                     photo_url=thumbnail or config.PING_IMG, # fallback thumbnail
                     title=title,
                     description=description,
@@ -74,6 +77,16 @@ async def inline_query_handler(_, query: types.InlineQuery):
             )
 
         if answers:
-            await app.answer_inline_query(query.id, results=answers, cache_time=5)
+            await app.answer_inline_query(
+                query.id, results=answers, cache_time=config.INLINE_CACHE_TIME
+            )
     except Exception as e:
         pass
+
+
+@app.on_chosen_inline_result(~app.bl_users)
+async def chosen_inline_result_handler(_, result: types.ChosenInlineResult):
+    # The result is about to be shared, most likely to be played; start
+    # fetching it at the lowest priority so /play finds it ready
+    if config.INLINE_WARM_DOWNLOAD:
+        yt.warm(result.result_id)
@@ -12,6 +12,7 @@ import pyrogram
 from pyrogram import enums, filters, types
 
 from HasiiMusic import tune, app, config, db, lang, logger, queue, tasks, userbot, yt
+from HasiiMusic.core.youtube import Priority
 from HasiiMusic.helpers import buttons
 
 
@@ -51,9 +52,10 @@ async def update_timer(length=10):
 
     async def _preload_next(chat_id, next_media):
         try:
-            next_media.file_path = await yt.download(
+            next_media.file_path = await yt.fetch(
                 next_media.id,
                 video=getattr(next_media, "video", False),
+                priority=Priority.NEXT_UP,
             )
         except Exception as e:
             print(f"Preload error for chat {chat_id}: {e}")
@@ -2,6 +2,8 @@
 # play.py - Core Playback
 # ==============================================================================
 # Handles all /play commands, searching YouTube, managing queues, and initiating playback.
+# The track starts downloading as soon as the search returns, while the
+# status message, play log and queue bookkeeping are still being done.
 # ==============================================================================
 
 from pyrogram import filters
@@ -11,6 +13,7 @@ from pyrogram.errors import FloodWait, MessageIdInvalid, MessageDeleteForbidden,
 from HasiiMusic import tune, app, config, db, lang, queue, spotify, tg, yt
 from HasiiMusic.helpers import buttons, utils
 from HasiiMusic.helpers._play import checkUB
+from HasiiMusic.core.youtube import Priority
 import asyncio
 import logging
 import re
@@ -58,6 +61,22 @@ async def auto_delete(message: types.Message, delay: int = 15):
     except Exception as e:
         logger.debug(f"auto_delete: couldnt delete message: {e}")
 
+async def fetch_track(chat_id: int, file, priority: Priority = Priority.NOW_PLAYING):
+    return await yt.fetch(
+        file.id,
+        is_live=file.is_live,
+        video=getattr(file, "video", False),
+        priority=priority,
+        replay=await db.get_loop(chat_id) != 0,
+    )
+
+
+def _consume(task: asyncio.Task) -> None:
+    # A speculative fetch may end up unawaited; keep its errors out of the event loop log
+    if not task.cancelled() and task.exception():
+        logger.debug(f"Speculative fetch failed: {task.exception()}")
+
+
 @app.on_message(
     filters.command(
         [
@@ -157,6 +176,8 @@ async def play_hndlr(
                 await safe_edit(sent, m.lang["playlist_error"])
                 return
 
+            # Flat playlist entries lack thumbnails/durations; fill them in while queued
+            yt.hydrate(tracks)
             file = tracks[0]
             tracks.remove(file)
             file.message_id = sent.id
@@ -197,49 +218,65 @@ async def play_hndlr(
         )
         return
 
-    if await db.is_logger():
-        await utils.play_log(m, file.title, file.duration)
-
     file.user = mention
     if force:
         queue.force_add(chat_id, file)
+        position = 0
     else:
         position = queue.add(chat_id, file)  # Returns 0-based index
 
-        # If a call is already active OR we are not the first in queue,
-        # we return early and let the background queue processor handle it.
-        if await db.get_call(chat_id) or position > 0:
-            # When call is active, position 0 is currently playing
-            # So actual waiting position is: position (e.g., 1st waiting = index 1)
-            # Display as 1-based for users: index 1 → "1st in queue"
-            await safe_edit(
-                sent,
-                m.lang["play_queued"].format(
-                    position,  # Shows waiting position: 1, 2, 3...
-                    file.url,
-                    file.title,
-                    file.duration,
-                    m.from_user.mention,
-                ),
-                reply_markup=buttons.play_queued(
-                    chat_id, file.id, m.lang["play_now"]
-                ),
-            )
-            if tracks:
-                for track in tracks:
-                    queue.add(chat_id, track)
-            
-            # ✨ NEW: Start preloading queued tracks in background
-            try:
-                from HasiiMusic import preload
-                asyncio.create_task(preload.start_preload(chat_id, count=2))
-            except Exception:
-                # Non-critical, continue without preload
-                pass
-            
-            return
+    # Start fetching now, concurrently with the logging and message edits below.
+    # Only a track that plays right away gets the foreground priority; one that
+    # waits in the queue is only warmed up.
+    play_now = force or (position == 0 and not await db.get_call(chat_id))
+    speculative = None
+    if not file.file_path and re.fullmatch(r"[A-Za-z0-9_-]{11}", file.id):
+        speculative = asyncio.create_task(fetch_track(
+            chat_id, file, Priority.NOW_PLAYING if play_now else Priority.SPECULATIVE
+        ))
+        speculative.add_done_callback(_consume)
 
-    if not file.file_path:
+    if await db.is_logger():
+        await utils.play_log(m, file.title, file.duration)
+
+    # If a call is already active OR we are not the first in queue,
+    # we return early and let the background queue processor handle it.
+    if not play_now:
+        # When call is active, position 0 is currently playing
+        # So actual waiting position is: position (e.g., 1st waiting = index 1)
+        # Display as 1-based for users: index 1 → "1st in queue"
+        await safe_edit(
+            sent,
+            m.lang["play_queued"].format(
+                position,  # Shows waiting position: 1, 2, 3...
+                file.url,
+                file.title,
+                file.duration,
+                m.from_user.mention,
+            ),
+            reply_markup=buttons.play_queued(
+                chat_id, file.id, m.lang["play_now"]
+            ),
+        )
+        if tracks:
+            for track in tracks:
+                queue.add(chat_id, track)
+        
+        # ✨ NEW: Start preloading queued tracks in background
+        try:
+            from HasiiMusic import preload
+            asyncio.create_task(preload.start_preload(chat_id, count=2))
+        except Exception:
+            # Non-critical, continue without preload
+            pass
+        
+        return
+
+    if not file.file_path and speculative and play_now:
+        file.file_path = await speculative
+    elif not file.file_path:
+        # Either nothing was started (Spotify/query IDs still need resolving), or it
+        # was started as a warm-up; fetching again joins it at full priority
         if not re.fullmatch(r"[A-Za-z0-9_-]{11}", file.id):
             try:
                 resolved = await yt.search(file.id, sent.id)
@@ -252,23 +289,19 @@ async def play_hndlr(
                         file.duration = resolved.duration
             except Exception:
                 pass
-        file.file_path = await yt.download(
-            file.id,
-            is_live=file.is_live,
-            video=getattr(file, "video", False),
+        file.file_path = await fetch_track(chat_id, file)
+    if not file.file_path:
+        if not await db.get_call(chat_id):
+            queue.clear(chat_id)
+        await safe_edit(
+            sent,
+            "<blockquote>❌ Failed to download media.\n\n"
+            "Possible reasons:\n"
+            "• YouTube detected bot activity (update cookies)\n"
+            "• Video is region-blocked or private\n"
+            "• Age-restricted content (requires cookies)</blockquote>"
         )
-        if not file.file_path:
-            if not await db.get_call(chat_id):
-                queue.clear(chat_id)
-            await safe_edit(
-                sent,
-                "<blockquote>❌ Failed to download media.\n\n"
-                "Possible reasons:\n"
-                "• YouTube detected bot activity (update cookies)\n"
-                "• Video is region-blocked or private\n"
-                "• Age-restricted content (requires cookies)</blockquote>"
-            )
-            return
+        return
 
     try:
         await tune.play_media(
@@ -0,0 +1,229 @@
+# ==============================================================================
+# pipeline.py - Search/Download Pipeline Benchmark
+# ==============================================================================
+# Measures the YouTube pipeline (Searcher, Downloader, PreloadManager) against
+# the offline FakeExtractor backend, so it runs without network or Telegram.
+#
+# Usage:
+#   python bench/pipeline.py                      # 1, 10, 100, 1000 chats
+#   python bench/pipeline.py --chats 1,50 --json  # machine-readable output
+#
+# For each concurrency level every chat searches a song (popular songs are
+# picked more often), plays it and queues two more that get preloaded; the
+# next track is then "played" to see if the preload made it ready.
+# Reports:
+# - time-to-playable p50/p95/p99 (search + fetch of the first track)
+# - search and download coalescing (callers per real extraction)
+# - download cache hit ratio and next-track readiness after preload
+# Before that it checks that search keys merge spellings of the same song and
+# keep different songs apart, in Latin as well as Indic scripts.
+# ==============================================================================
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The package reads its config at import time; give it placeholders and run
+# inside a scratch directory so downloads/ and logs never touch the checkout.
+# The persistent search cache is off: there is no database behind the bench.
+for key, value in {
+    "API_ID": "1",
+    "API_HASH": "bench",
+    "BOT_TOKEN": "1:bench",
+    "MONGO_DB_URI": "mongodb://127.0.0.1:27017",
+    "LOGGER_ID": "-1001",
+    "OWNER_ID": "1",
+    "STRING_SESSION": "bench",
+    "SEARCH_CACHE_DB_TTL_HOURS": "0",
+    "TRACK_STORE_DB_TTL_HOURS": "0",
+}.items():
+    os.environ.setdefault(key, value)
+WORKDIR = tempfile.mkdtemp(prefix="hasii-bench-")
+os.chdir(WORKDIR)
+sys.path.insert(0, ROOT)
+
+import logging  # noqa: E402
+
+import HasiiMusic  # noqa: E402
+from HasiiMusic.core.youtube import YouTube  # noqa: E402
+from HasiiMusic.core.youtube.fake import FakeExtractor  # noqa: E402
+from HasiiMusic.core.youtube.telemetry import percentiles  # noqa: E402
+from HasiiMusic.helpers import normalize_query  # noqa: E402
+
+logging.getLogger("HasiiMusic").setLevel(logging.WARNING)
+
+
+# Queries that must share one search key, and queries that must not
+SAME_KEY = [
+    ("Shape of You", "shape of you (Official Video)"),
+    ("Ed Sheeran - Shape of You", "shape of you ed sheeran"),
+    ("Beyoncé - Halo", "beyonce halo"),
+    ("तुम ही हो", "तुम ही हो lyrics"),
+]
+DIFFERENT_KEY = [
+    ("मेरे रश्के क़मर", "मेरी रश्के कमर"),  # Devanagari: vowel sign and nukta
+    ("दिल से", "से दिल"),  # Devanagari word order
+    ("காதல் பாடல்", "காதல பாடல"),  # Tamil: virama
+    ("ශ්‍රී ලංකා", "ශ ර ලංකා"),  # Sinhala conjunct
+]
+
+
+def _check_queries() -> list[str]:
+    """Search-key collisions and misses, as readable failure messages."""
+    failures = [
+        f"{a!r} and {b!r} should share a key: {normalize_query(a)} != {normalize_query(b)}"
+        for a, b in SAME_KEY if normalize_query(a) != normalize_query(b)
+    ]
+    failures += [
+        f"{a!r} and {b!r} must not collide: both {normalize_query(a)}"
+        for a, b in DIFFERENT_KEY if normalize_query(a) == normalize_query(b)
+    ]
+    return failures
+
+
+def _catalog(size: int) -> list[str]:
+    return [f"bench song {i}" for i in range(size)]
+
+
+def _pick(rng: random.Random, catalog: list[str]) -> str:
+    # Zipf-like popularity: a few songs are requested by many chats at once
+    index = min(len(catalog) - 1, int(rng.paretovariate(1.2)) - 1)
+    return catalog[index]
+
+
+async def _chat(chat_id: int, rng: random.Random, catalog: list[str], results: dict) -> None:
+    yt, queue, preload = HasiiMusic.yt, HasiiMusic.queue, HasiiMusic.preload
+    started = time.monotonic()
+    results["searches"] += 1
+    track = await yt.search(_pick(rng, catalog), chat_id)
+    if not track:
+        results["failed"] += 1
+        return
+    track.file_path = await yt.fetch(track.id)
+    if not track.file_path:
+        results["failed"] += 1
+        return
+    results["time_to_playable"].append(time.monotonic() - started)
+
+    queue.add(chat_id, track)
+    for _ in range(2):
+        results["searches"] += 1
+        upcoming = await yt.search(_pick(rng, catalog), chat_id)
+        if upcoming:
+            queue.add(chat_id, upcoming)
+    await preload.start_preload(chat_id, 2)
+
+
+async def _run_level(chats: int, args) -> dict:
+    shutil.rmtree("downloads", ignore_errors=True)
+    os.makedirs("downloads", exist_ok=True)
+    backend = FakeExtractor(
+        latency=args.latency,
+        bandwidth=args.bandwidth * 1024,
+        media_size=args.size * 1024,
+        media_file=args.media_file,
+        fail_rate=args.fail_rate,
+    )
+    # PreloadManager and the queue look these up on the package at call time
+    HasiiMusic.yt = YouTube(backend=backend)
+    HasiiMusic.queue.queues.clear()
+
+    rng = random.Random(args.seed)
+    catalog = _catalog(args.catalog)
+    results = {"time_to_playable": [], "failed": 0, "searches": 0}
+    started = time.monotonic()
+    await asyncio.gather(*(
+        _chat(chat_id, random.Random(rng.random()), catalog, results)
+        for chat_id in range(1, chats + 1)
+    ))
+    wall = time.monotonic() - started
+
+    # Let preloads finish, then check how many next tracks are ready to play
+    pending = [t for tasks in HasiiMusic.preload._preload_tasks.values() for t in tasks]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    ready = total_next = 0
+    for chat_id in range(1, chats + 1):
+        upcoming = HasiiMusic.queue.peek_next(chat_id, 1)
+        if upcoming:
+            total_next += 1
+            ready += bool(upcoming[0].file_path)
+
+    stats = HasiiMusic.yt.stats()
+    downloads = stats["in_flight"]
+    return {
+        "chats": chats,
+        "wall_seconds": round(wall, 3),
+        "failed": results["failed"],
+        "time_to_playable": percentiles(results["time_to_playable"]),
+        "search_calls": results["searches"],
+        "search_extractions": backend.searches,
+        "download_requests": stats["downloads"]["downloads"],
+        "download_extractions": backend.downloads,
+        "download_coalesced": downloads["coalesced"],
+        "cache_hit_ratio": stats["cache"]["hit_ratio"],
+        "next_track_ready": round(ready / total_next, 3) if total_next else None,
+    }
+
+
+def _print_table(rows: list[dict]) -> None:
+    header = (
+        f"{'chats':>6} {'wall':>7} {'ttp p50':>8} {'ttp p95':>8} {'ttp p99':>8} "
+        f"{'searches':>9} {'yt':>5} {'dl':>6} {'yt':>5} {'hit%':>6} {'ready%':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        ttp = r["time_to_playable"]
+        print(
+            f"{r['chats']:>6} {r['wall_seconds']:>7.2f} "
+            f"{ttp['p50'] or 0:>8.3f} {ttp['p95'] or 0:>8.3f} {ttp['p99'] or 0:>8.3f} "
+            f"{r['search_calls']:>9} {r['search_extractions']:>5} "
+            f"{r['download_requests']:>6} {r['download_extractions']:>5} "
+            f"{r['cache_hit_ratio'] * 100:>6.1f} "
+            f"{(r['next_track_ready'] or 0) * 100:>7.1f}"
+        )
+    print("\nsearches/dl = requests made, yt = extractions the fake backend served")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the search/download pipeline")
+    parser.add_argument("--chats", default="1,10,100,1000", help="comma-separated concurrency levels")
+    parser.add_argument("--catalog", type=int, default=200, help="distinct songs chats pick from")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake extraction")
+    parser.add_argument("--bandwidth", type=int, default=5120, help="KB/s per fake download")
+    parser.add_argument("--size", type=int, default=256, help="KB written per fake download")
+    parser.add_argument("--media-file", help="copy this file for every download instead")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of videos that fail")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    failures = _check_queries()
+    if failures:
+        os.chdir(ROOT)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+        sys.exit("Search key checks failed:\n" + "\n".join(failures))
+
+    try:
+        rows = [await _run_level(int(n), args) for n in args.chats.split(",")]
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -59,8 +59,110 @@ class Config:
 
         self.VIDEO_MAX_HEIGHT: int = self._parse_video_height()
 
+        # DOWNLOAD CACHE
+        # Follow changes to downloads/ via inotify (needs inotify_simple)
+        self.DOWNLOAD_INDEX_WATCH: bool = self._str_to_bool(getenv("DOWNLOAD_INDEX_WATCH", "False"))
+        # Max size of downloads/ in GB before old files are evicted (0 = unlimited)
+        self.DOWNLOAD_CACHE_MAX_GB: float = float(getenv("DOWNLOAD_CACHE_MAX_GB", "0"))
+        # Max parallel YouTube downloads, and how many of them background preloads may use
+        self.DOWNLOAD_CONCURRENCY: int = int(getenv("DOWNLOAD_CONCURRENCY", "5"))
+        self.DOWNLOAD_BACKGROUND_SLOTS: int = int(getenv("DOWNLOAD_BACKGROUND_SLOTS", "0"))
+        # Eviction policy: "lru" (least recently used) or "lfu" (least frequently used)
+        self.DOWNLOAD_CACHE_POLICY: str = getenv("DOWNLOAD_CACHE_POLICY", "lru").lower()
+        # Under lfu, files used within this many minutes are evicted last, so new downloads get to earn hits
+        self.DOWNLOAD_CACHE_LFU_GRACE_MINUTES: int = int(getenv("DOWNLOAD_CACHE_LFU_GRACE_MINUTES", "30"))
+        # Free disk space every download must leave behind (MB)
+        self.DOWNLOAD_MIN_FREE_MB: int = int(getenv("DOWNLOAD_MIN_FREE_MB", "100"))
+        # Extra free space only now-playing downloads may use; preloads are deferred instead (MB)
+        self.DOWNLOAD_RESERVE_MB: int = int(getenv("DOWNLOAD_RESERVE_MB", "500"))
+        # Interrupted downloads are resumed; their partial files are deleted after this long unused (0 = keep)
+        self.DOWNLOAD_PARTIAL_TTL_HOURS: float = float(getenv("DOWNLOAD_PARTIAL_TTL_HOURS", "6"))
+
+        # Remux a cached video into an audio-only file when the same track is played as audio
+        self.DOWNLOAD_DERIVE_AUDIO: bool = self._str_to_bool(getenv("DOWNLOAD_DERIVE_AUDIO", "True"))
+
+        # Store preloaded audio as Ogg/Opus so playback needs almost no probing
+        self.AUDIO_NORMALIZE: bool = self._str_to_bool(getenv("AUDIO_NORMALIZE", "False"))
+        # Max concurrent ffmpeg normalise/remux processes
+        self.AUDIO_NORMALIZE_JOBS: int = int(getenv("AUDIO_NORMALIZE_JOBS", "2"))
+        # Opus bitrate used when the source has to be re-encoded
+        self.AUDIO_NORMALIZE_BITRATE: str = getenv("AUDIO_NORMALIZE_BITRATE", "128k")
+
+        # Parallel ranged connections per video download (0/1 = let yt-dlp download it)
+        self.VIDEO_DOWNLOAD_CONNECTIONS: int = int(getenv("VIDEO_DOWNLOAD_CONNECTIONS", "0"))
+        # Size of each ranged chunk (MB)
+        self.VIDEO_DOWNLOAD_CHUNK_MB: int = int(getenv("VIDEO_DOWNLOAD_CHUNK_MB", "4"))
+        # Bandwidth cap per video download across all its connections (KB/s, 0 = unlimited)
+        self.VIDEO_DOWNLOAD_RATE_KB: int = int(getenv("VIDEO_DOWNLOAD_RATE_KB", "0"))
+
+        # PROGRESSIVE PLAYBACK
+        # Start playing audio once enough is downloaded instead of waiting for the full file
+        self.PROGRESSIVE_PLAYBACK: bool = self._str_to_bool(getenv("PROGRESSIVE_PLAYBACK", "False"))
+        # How much must be on disk before playback starts (KB)
+        self.PROGRESSIVE_BUFFER_KB: int = int(getenv("PROGRESSIVE_BUFFER_KB", "1024"))
+        # Seconds without new data before a progressive stream counts as stalled
+        self.PROGRESSIVE_STALL_TIMEOUT: int = int(getenv("PROGRESSIVE_STALL_TIMEOUT", "5"))
+
+        # DIRECT STREAM
+        # Play audio straight from the resolved YouTube URL without downloading it
+        # (tracks in loop mode are still downloaded so replays are free)
+        self.DIRECT_STREAM: bool = self._str_to_bool(getenv("DIRECT_STREAM", "False"))
+        # Re-resolve a stream URL if it expires within this many seconds of the track ending
+        self.DIRECT_STREAM_REFRESH_MARGIN: int = int(getenv("DIRECT_STREAM_REFRESH_MARGIN", "600"))
+
+        # SEARCH CACHE
+        # Search results kept in memory, and for how long (minutes)
+        self.SEARCH_CACHE_SIZE: int = int(getenv("SEARCH_CACHE_SIZE", "500"))
+        self.SEARCH_CACHE_TTL_MINUTES: float = float(getenv("SEARCH_CACHE_TTL_MINUTES", "30"))
+        # How long search results survive in MongoDB, across restarts (hours, 0 = memory only)
+        self.SEARCH_CACHE_DB_TTL_HOURS: float = float(getenv("SEARCH_CACHE_DB_TTL_HOURS", "24"))
+        # Share of searches that may get a second, hedged attempt when slower than the usual p95 (0 = off)
+        self.SEARCH_HEDGE_RATE: float = float(getenv("SEARCH_HEDGE_RATE", "0.05"))
+        # Never hedge a search sooner than this (ms)
+        self.SEARCH_HEDGE_MIN_MS: int = int(getenv("SEARCH_HEDGE_MIN_MS", "500"))
+
+        # Playlist tracks whose thumbnails/durations are fetched at once after queueing
+        self.PLAYLIST_HYDRATE_CONCURRENCY: int = int(getenv("PLAYLIST_HYDRATE_CONCURRENCY", "4"))
+        # How long a YouTube playlist's listing is kept for further batches (minutes)
+        self.PLAYLIST_STATE_TTL_MINUTES: float = float(getenv("PLAYLIST_STATE_TTL_MINUTES", "60"))
+        # Remember videos YouTube refused to serve (private, removed, blocked) and skip them
+        self.UNPLAYABLE_CACHE: bool = self._str_to_bool(getenv("UNPLAYABLE_CACHE", "True"))
+
+        # INLINE QUERIES
+        # Wait this long after the last keystroke before searching (ms)
+        self.INLINE_DEBOUNCE_MS: int = int(getenv("INLINE_DEBOUNCE_MS", "400"))
+        # Seconds inline results are cached, by the bot and by Telegram
+        self.INLINE_CACHE_TIME: int = int(getenv("INLINE_CACHE_TIME", "300"))
+        # Start downloading an inline result as soon as a user picks it
+        self.INLINE_WARM_DOWNLOAD: bool = self._str_to_bool(getenv("INLINE_WARM_DOWNLOAD", "True"))
+        # Track metadata kept in memory (tracks) and for how long (hours)
+        self.TRACK_STORE_SIZE: int = int(getenv("TRACK_STORE_SIZE", "5000"))
+        self.TRACK_STORE_TTL_HOURS: float = float(getenv("TRACK_STORE_TTL_HOURS", "24"))
+        # How long track metadata survives in MongoDB, across restarts (hours, 0 = memory only)
+        self.TRACK_STORE_DB_TTL_HOURS: float = float(getenv("TRACK_STORE_DB_TTL_HOURS", "168"))
+
+        # YT-DLP WORKER POOL
+        # Number of yt-dlp worker processes (0 = run yt-dlp in threads)
+        self.YTDLP_WORKERS: int = int(getenv("YTDLP_WORKERS", "0"))
+        # Restart each worker after this many jobs to keep memory in check
+        self.YTDLP_WORKER_MAX_JOBS: int = int(getenv("YTDLP_WORKER_MAX_JOBS", "200"))
+        # Kill a worker that goes silent on a job for longer than this (seconds);
+        # downloads report progress, so long tracks don't count as stuck
+        self.YTDLP_WORKER_TIMEOUT: int = int(getenv("YTDLP_WORKER_TIMEOUT", "300"))
+
+        # METRICS
+        # Port for the JSON download metrics endpoint (0 = disabled)
+        self.METRICS_PORT: int = int(getenv("METRICS_PORT", "0"))
+        self.METRICS_HOST: str = getenv("METRICS_HOST", "127.0.0.1")
+
         # YOUTUBE COOKIES
         self.COOKIES_URL: List[str] = self._parse_cookies()
+        # Max yt-dlp requests per cookie file per minute (0 = unlimited)
+        self.COOKIE_RATE_PER_MIN: int = int(getenv("COOKIE_RATE_PER_MIN", "30"))
+        # First quarantine for a failing cookie (seconds); doubles on each further failure
+        self.COOKIE_QUARANTINE_BASE: int = int(getenv("COOKIE_QUARANTINE_BASE", "60"))
+        # Longest a cookie can be quarantined (seconds)
+        self.COOKIE_QUARANTINE_MAX: int = int(getenv("COOKIE_QUARANTINE_MAX", "3600"))
 
         # IMAGE URLS
         self.DEFAULT_THUMB: str = getenv(